@@ -0,0 +1,193 @@
+"""
+Vectorized backtest of the scoring model over stored history.
+
+Replays the per-day factor scores in the history store (price, news,
+insider) against the local close history, entirely offline. Everything is
+laid out as (dates x tickers) NumPy arrays, so scoring, banding and
+forward returns for every ticker and day are a handful of array operations.
+
+A signal dated D is assumed to be acted on at D's close, and its forward
+return is close[D + horizon] / close[D] - 1 in trading days.
+
+    python src/backtest.py --horizon 5
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+
+import numpy as np
+
+from dst_agent import (
+    WEIGHTS, BUY_THRESHOLD, SELL_THRESHOLD, STRONG_BUY_THRESHOLD, STRONG_SELL_THRESHOLD,
+)
+from history import HISTORY_PATH, connect
+
+FACTORS = ("price", "news", "insider")
+
+
+def load_panel(start=None, end=None, path=HISTORY_PATH):
+    """Load aligned arrays from the history store
+
+    Returns (dates, tickers, factors, closes) where factors is float
+    [dates, tickers, 3] in FACTORS order and closes is [dates, tickers];
+    missing values are NaN. Rows are trading dates from the price history.
+    """
+    conn = connect(path)
+    where, params = "", []
+    if start:
+        where += " AND date >= ?"
+        params.append(start)
+    if end:
+        where += " AND date <= ?"
+        params.append(end)
+    prices = conn.execute(f"SELECT date, ticker, close FROM prices WHERE 1=1{where}", params).fetchall()
+    scores = conn.execute(
+        f"SELECT date, ticker, price_score, news_score, insider_score FROM signals WHERE 1=1{where}", params
+    ).fetchall()
+    conn.close()
+
+    if not prices or not scores:
+        return [], [], np.empty((0, 0, len(FACTORS))), np.empty((0, 0))
+
+    price_dates, price_tickers, price_values = (np.array(col) for col in zip(*prices))
+    score_dates, score_tickers = (np.array(col) for col in list(zip(*scores))[:2])
+    score_values = np.array([row[2:] for row in scores], dtype=float)
+
+    dates = np.unique(price_dates)
+    tickers = np.intersect1d(np.unique(price_tickers), np.unique(score_tickers))
+
+    closes = np.full((len(dates), len(tickers)), np.nan)
+    keep = np.isin(price_tickers, tickers)
+    closes[np.searchsorted(dates, price_dates[keep]),
+           np.searchsorted(tickers, price_tickers[keep])] = price_values[keep].astype(float)
+
+    # Reports on non-trading days have no close to act on
+    factors = np.full((len(dates), len(tickers), len(FACTORS)), np.nan)
+    keep = np.isin(score_tickers, tickers) & np.isin(score_dates, dates)
+    factors[np.searchsorted(dates, score_dates[keep]),
+            np.searchsorted(tickers, score_tickers[keep])] = score_values[keep]
+    dates, tickers = dates.tolist(), tickers.tolist()
+    return dates, tickers, factors, closes
+
+
+def forward_returns(closes, horizon):
+    """close[t + horizon] / close[t] - 1, NaN where either end is missing"""
+    if horizon < 1:
+        raise ValueError(f"horizon must be at least 1 trading day, got {horizon}")
+    fwd = np.full_like(closes, np.nan)
+    if horizon < len(closes):
+        fwd[:-horizon] = closes[horizon:] / closes[:-horizon] - 1
+    return fwd
+
+
+def horizon_arg(text):
+    """argparse type for --horizon: a whole number of trading days, at least 1"""
+    try:
+        horizon = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid horizon: {text!r}")
+    if horizon < 1:
+        raise argparse.ArgumentTypeError(f"horizon must be at least 1, got {horizon}")
+    return horizon
+
+
+def band_positions(scores, buy=BUY_THRESHOLD, sell=SELL_THRESHOLD):
+    """+1 for Buy, -1 for Sell, 0 for Hold or no signal"""
+    return np.where(scores >= buy, 1, np.where(scores <= sell, -1, 0)).astype(np.int8)
+
+
+def _rowwise_corr(a, b):
+    """Per-date Pearson correlation across tickers, ignoring NaNs"""
+    mask = ~(np.isnan(a) | np.isnan(b))
+    n = mask.sum(axis=1)
+    a = np.where(mask, a, 0.0)
+    b = np.where(mask, b, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = a.sum(axis=1) / n
+        mean_b = b.sum(axis=1) / n
+        da = np.where(mask, a - mean_a[:, None], 0.0)
+        db = np.where(mask, b - mean_b[:, None], 0.0)
+        corr = (da * db).sum(axis=1) / np.sqrt((da ** 2).sum(axis=1) * (db ** 2).sum(axis=1))
+    return np.where(n >= 3, corr, np.nan)
+
+
+def _nanmean(values):
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else np.nan
+
+
+def evaluate(factors, fwd, weights, buy=BUY_THRESHOLD, sell=SELL_THRESHOLD,
+             strong_buy=STRONG_BUY_THRESHOLD, strong_sell=STRONG_SELL_THRESHOLD, horizon=1):
+    """Score one parameter set; returns a dict of summary metrics
+
+    weights is a length-3 sequence in FACTORS order. Missing factor scores
+    count as neutral (0), like build_signal does for missing stages.
+    """
+    has_signal = ~np.isnan(factors).all(axis=2)
+    scores = np.nan_to_num(factors) @ np.asarray(weights, dtype=float)
+    scores = np.where(has_signal, scores, np.nan)
+    positions = band_positions(scores, buy, sell)
+
+    active = (positions != 0) & ~np.isnan(fwd)
+    realized = np.where(active, positions * fwd, np.nan)
+    strong = active & ((scores >= strong_buy) | (scores <= strong_sell))
+
+    # Equal-weight long/short portfolio of the day's non-Hold signals
+    per_day = active.sum(axis=1)
+    daily = np.nansum(realized, axis=1)[per_day > 0] / per_day[per_day > 0]
+    periods_per_year = 252 / max(horizon, 1)
+    sharpe = daily.mean() / daily.std() * np.sqrt(periods_per_year) if len(daily) > 1 and daily.std() > 0 else np.nan
+
+    # Turnover: share of tracked tickers whose band changed from one day to the next
+    tracked = has_signal[1:] & has_signal[:-1]
+    changes = (positions[1:] != positions[:-1]) & tracked
+    with np.errstate(invalid="ignore", divide="ignore"):
+        turnover = _nanmean(changes.sum(axis=1) / tracked.sum(axis=1))
+
+    buys = active & (positions > 0)
+    sells = active & (positions < 0)
+    return {
+        "signals": int(active.sum()),
+        "hit_rate": float((realized[active] > 0).mean()) if active.any() else np.nan,
+        "hit_rate_high": float((realized[strong] > 0).mean()) if strong.any() else np.nan,
+        "mean_return": float(np.nanmean(realized[active])) if active.any() else np.nan,
+        "buy_return": float(fwd[buys].mean()) if buys.any() else np.nan,
+        "sell_return": float(fwd[sells].mean()) if sells.any() else np.nan,
+        "ic": _nanmean(_rowwise_corr(scores, fwd)),
+        "sharpe": float(sharpe),
+        "turnover": turnover,
+    }
+
+
+def run_backtest(horizon=5, weights=None, buy=BUY_THRESHOLD, sell=SELL_THRESHOLD,
+                 start=None, end=None, path=HISTORY_PATH):
+    dates, tickers, factors, closes = load_panel(start, end, path)
+    if not dates or not tickers:
+        return None
+    weights = weights or [WEIGHTS[f] for f in FACTORS]
+    metrics = evaluate(factors, forward_returns(closes, horizon), weights, buy, sell, horizon=horizon)
+    metrics.update({"dates": len(dates), "tickers": len(tickers), "horizon": horizon})
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the scoring model on stored history")
+    parser.add_argument("--horizon", type=horizon_arg, default=5, help="forward return horizon in trading days")
+    parser.add_argument("--weights", type=float, nargs=3, metavar=("PRICE", "NEWS", "INSIDER"))
+    parser.add_argument("--buy", type=float, default=BUY_THRESHOLD)
+    parser.add_argument("--sell", type=float, default=SELL_THRESHOLD)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    args = parser.parse_args()
+
+    metrics = run_backtest(args.horizon, args.weights, args.buy, args.sell, args.start, args.end)
+    if metrics is None:
+        print("No overlapping signal and price history; run 'python src/history.py import' first.")
+        return
+    for key, value in metrics.items():
+        print(f"{key:>14}: {value:.4f}" if isinstance(value, float) else f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Disk cache for provider responses, shared by every process on the host.
+
+Fetchers wrapped with @cached store each non-empty result in data/cache.db
+(DST_CACHE_PATH). Callers choose how old an entry they will accept with
+max_age (seconds). Fundamentals move slowly and are reused for
+FUNDAMENTALS_TTL by default; prices, insider filings and headlines default to
+a live fetch (which still refreshes the cache), and only the daily batch
+accepts entries up to CACHE_MAX_AGE old.
+
+The pre-warm phase fills the cache for the whole universe in the window
+before the scheduled run. It uses one low-priority thread per provider,
+rate-limited so the calls are spread evenly over the window, and skips
+anything already fresh:
+
+    python src/cache.py prewarm [--window-minutes 120]
+    python src/cache.py stats
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import functools
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from ratelimit import TokenBucket
+from tracing import span
+
+CACHE_PATH = os.getenv("DST_CACHE_PATH", "data/cache.db")
+CACHE_MAX_AGE = int(os.getenv("DST_CACHE_MAX_AGE", str(3 * 3600)))
+FUNDAMENTALS_TTL = int(os.getenv("DST_CACHE_FUNDAMENTALS_TTL", str(24 * 3600)))
+PREWARM_MINUTES = int(os.getenv("DST_PREWARM_MINUTES", "120"))
+
+# Calls per minute each provider tolerates; pre-warming never goes faster
+PROVIDER_RATES = {
+    "alphavantage": float(os.getenv("DST_PREWARM_AV_PER_MIN", "5")),
+    "sec": float(os.getenv("DST_PREWARM_SEC_PER_MIN", "30")),
+    "news": float(os.getenv("DST_PREWARM_NEWS_PER_MIN", "30")),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+MISS = object()
+_bypass = False
+
+
+def bypass():
+    """Neither read nor write the cache for the rest of this process
+
+    Record/replay runs (see replay.py) need every fetch to reach the transport.
+    """
+    global _bypass
+    _bypass = True
+
+
+def connect(path=CACHE_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def lookup(namespace, key, max_age, path=CACHE_PATH):
+    """The stored value if younger than max_age seconds, else MISS"""
+    if max_age <= 0 or _bypass:
+        return MISS
+    conn = connect(path)
+    row = conn.execute(
+        "SELECT value FROM cache WHERE namespace = ? AND key = ? AND stored_at >= ?",
+        (namespace, key, time.time() - max_age),
+    ).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else MISS
+
+
+def store(namespace, key, value, path=CACHE_PATH):
+    if _bypass:
+        return
+    conn = connect(path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                     (namespace, key, json.dumps(value), time.time()))
+    conn.close()
+
+
+def cache_key(fn, args, kwargs):
+    """Key on the bound arguments, so f(t) and f(t, limit=3) share an entry when 3 is the default"""
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps(bound.arguments, sort_keys=True, default=str)
+
+
+def cached(namespace, ttl=0):
+    """Decorator: serve fn(*args) from the disk cache when younger than max_age
+
+    The wrapper takes an extra max_age keyword (defaulting to `ttl`); 0 always
+    fetches. Empty results ({} / [] / None) usually mean a failed request and
+    are never stored.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, max_age=None, **kwargs):
+            key = cache_key(fn, args, kwargs)
+            with span("cache", namespace=namespace, key=key) as s:
+                try:
+                    value = lookup(namespace, key, ttl if max_age is None else max_age)
+                except sqlite3.Error as e:
+                    print(f"Cache read failed for {namespace}: {e}")
+                    value = MISS
+                s.tag(hit=value is not MISS)
+                if value is not MISS:
+                    return value
+                value = fn(*args, **kwargs)
+                if value:
+                    try:
+                        store(namespace, key, value)
+                    except sqlite3.Error as e:
+                        print(f"Cache write failed for {namespace}: {e}")
+                return value
+        wrapper.namespace = namespace
+        wrapper.fetch = fn
+        return wrapper
+    return decorate
+
+
+def is_fresh(fn, *args, max_age, **kwargs):
+    """True if a @cached fetcher would answer these arguments from the cache"""
+    return lookup(fn.namespace, cache_key(fn.fetch, args, kwargs), max_age) is not MISS
+
+
+def stats(path=CACHE_PATH):
+    conn = connect(path)
+    rows = conn.execute(
+        "SELECT namespace, COUNT(*), MIN(stored_at), MAX(stored_at) FROM cache GROUP BY namespace"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def prewarm(tickers, window_seconds=PREWARM_MINUTES * 60, max_age=CACHE_MAX_AGE):
+    """Fill the cache for every ticker before the scheduled run
+
+    Each provider gets its own thread and token bucket, paced to spread its
+    calls over `window_seconds` but never above PROVIDER_RATES. Entries already
+    younger than `max_age` are skipped without spending a token. Returns
+    {provider: calls made}.
+    """
+    # Imported here because dst_agent wraps its fetchers with this module
+    from dst_agent import get_daily_closes, get_fundamentals
+    from insider_scraper import get_insider_transactions
+    from news_scraper import get_stock_news
+
+    jobs = {
+        "alphavantage": [(get_fundamentals, max(max_age, FUNDAMENTALS_TTL)), (get_daily_closes, max_age)],
+        "news": [(get_stock_news, max_age)],
+        "sec": [(get_insider_transactions, max_age)],
+    }
+    made = {}
+
+    def warm(provider, fetchers):
+        pending = [(fn, age, t) for t in tickers for fn, age in fetchers if not is_fresh(fn, t, max_age=age)]
+        if not pending:
+            made[provider] = 0
+            return
+        per_second = min(PROVIDER_RATES[provider] / 60, len(pending) / max(window_seconds, 1))
+        bucket = TokenBucket(per_second, 1)
+        count = 0
+        for fn, age, ticker in pending:
+            bucket.acquire()
+            try:
+                fn(ticker, max_age=age)
+                count += 1
+            except Exception as e:
+                print(f"Pre-warm {fn.__name__}({ticker}) failed: {e}")
+        made[provider] = count
+        print(f"Pre-warmed {count} {provider} call(s)")
+
+    threads = [threading.Thread(target=warm, args=item, name=f"prewarm-{item[0]}", daemon=True)
+               for item in jobs.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return made
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider response cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("prewarm", help="fill the cache for the whole universe ahead of the daily run")
+    warm.add_argument("--window-minutes", type=float, default=PREWARM_MINUTES,
+                      help="spread the calls over this long (default: DST_PREWARM_MINUTES)")
+    sub.add_parser("stats", help="entries per namespace")
+    args = parser.parse_args()
+
+    if args.command == "prewarm":
+        from dst_agent import load_tickers
+        from watchlists import all_tickers, load_watchlists
+
+        if hasattr(os, "nice"):
+            os.nice(10)  # stay out of the way of the bot and anything interactive
+        tickers = all_tickers(load_tickers(), load_watchlists())
+        print(f"Pre-warming {len(tickers)} ticker(s) over {args.window_minutes:.0f} min")
+        prewarm(tickers, args.window_minutes * 60)
+    else:
+        for namespace, count, oldest, newest in stats():
+            print(f"{namespace:<14} {count:>6} entries, "
+                  f"oldest {(time.time() - oldest) / 60:.0f} min, newest {(time.time() - newest) / 60:.0f} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Discord webhook delivery.
+
+Posts go through one pooled aiohttp session and respect Discord's per-route
+rate-limit buckets (X-RateLimit-Remaining / X-RateLimit-Reset-After), retry on
+429 using Retry-After and on 5xx with backoff, and report any message that
+could not be delivered instead of silently dropping the rest of the report.
+"""
+import asyncio
+import time
+
+import aiohttp
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_CHARS_PER_MESSAGE = 6000   # Discord's combined limit across a message's embeds
+MAX_RETRIES = 5
+
+
+class WebhookDeliveryError(Exception):
+    """Raised when a webhook message is rejected or retries are exhausted"""
+
+
+class WebhookRejectedError(WebhookDeliveryError):
+    """Raised when Discord refuses a message outright (4xx other than 429); retrying won't help"""
+
+
+def embed_length(embed):
+    """Characters Discord counts towards the 6000 per-message embed limit"""
+    total = len(embed.get("title", "")) + len(embed.get("description", ""))
+    total += len(embed.get("footer", {}).get("text", ""))
+    total += len(embed.get("author", {}).get("name", ""))
+    for field in embed.get("fields", []):
+        total += len(field.get("name", "")) + len(field.get("value", ""))
+    return total
+
+
+def pack_embeds(embeds):
+    """Group embeds into as few webhook payloads as Discord's limits allow"""
+    payloads, current, size = [], [], 0
+    for embed in embeds:
+        length = embed_length(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or size + length > MAX_CHARS_PER_MESSAGE):
+            payloads.append({"embeds": current})
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        payloads.append({"embeds": current})
+    return payloads
+
+
+class WebhookClient:
+    """Async webhook poster sharing one connection pool and rate-limit state"""
+
+    def __init__(self, max_retries=MAX_RETRIES, timeout=15):
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = None
+        self._route_buckets = {}   # webhook url -> X-RateLimit-Bucket id
+        self._bucket_resume = {}   # bucket id -> monotonic time it has capacity again
+        self._global_resume = 0.0
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=10),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _wait_for_capacity(self, url):
+        bucket = self._route_buckets.get(url, url)
+        resume = max(self._global_resume, self._bucket_resume.get(bucket, 0.0))
+        delay = resume - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _record_limits(self, url, headers):
+        bucket = headers.get("X-RateLimit-Bucket")
+        if bucket:
+            self._route_buckets[url] = bucket
+        else:
+            bucket = self._route_buckets.get(url, url)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None and int(remaining) == 0:
+            self._bucket_resume[bucket] = time.monotonic() + float(reset_after)
+
+    async def post(self, url, payload):
+        """Post one message; returns Discord's message object (or {} if none was sent back)"""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_capacity(url)
+            try:
+                async with self.session.post(url, params={"wait": "true"}, json=payload) as response:
+                    self._record_limits(url, response.headers)
+                    if response.status in (200, 204):
+                        return await response.json() if response.status == 200 else {}
+
+                    body = await response.text()
+                    if response.status == 429:
+                        retry_after = float(response.headers.get("Retry-After", 1))
+                        try:
+                            retry_after = float((await response.json()).get("retry_after", retry_after))
+                        except (aiohttp.ContentTypeError, ValueError):
+                            pass
+                        resume = time.monotonic() + retry_after
+                        if response.headers.get("X-RateLimit-Global"):
+                            self._global_resume = resume
+                        else:
+                            self._bucket_resume[self._route_buckets.get(url, url)] = resume
+                        print(f"Discord rate limited; retrying in {retry_after:.2f}s")
+                        continue
+                    if response.status < 500:
+                        raise WebhookRejectedError(f"Discord rejected message: {response.status} {body[:200]}")
+                    print(f"Discord returned {response.status}; retrying")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Webhook request failed: {e}; retrying")
+            await asyncio.sleep(min(2 ** attempt, 30))
+        raise WebhookDeliveryError(f"Gave up after {self.max_retries + 1} attempts")
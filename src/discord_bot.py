@@ -1,76 +1,403 @@
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio
 import discord
-from discord.ext import commands
-from datetime import datetime
+from discord.ext import commands, tasks
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import re
+import time
 
 # Import your existing analysis modules
-from dst_agent import analyze_tickers
+from dst_agent import (
+    analyze_insider, analyze_news_with_gpt, build_signal, find_latest_log,
+    classify_score, get_fundamentals, get_price_change_pct, load_log, probe_ticker,
+)
 from insider_scraper import get_insider_activity
 from news_scraper import get_stock_news
+from work_queue import (
+    PRIORITY_ANALYZE, PRIORITY_MISS, PRIORITY_REFRESH, QueueFullError, RateLimitedError, WorkQueue,
+)
+from history import ticker_history
+from report_diff import diff_reports
+from profiling import profile_call
+from resilience import provider_health
+from watchlists import (
+    add_tickers, get_list, load_watchlists, remove_tickers, save_watchlists,
+    subscriber_lists, subset_report,
+)
 from config.config import DISCORD_BOT_TOKEN
 
+# Analysis runs on a dedicated thread pool so the event loop (and heartbeats)
+# never block on the synchronous data providers.
+BOT_ANALYSIS_WORKERS = int(os.getenv("BOT_ANALYSIS_WORKERS", "4"))
+BOT_MAX_PENDING = int(os.getenv("BOT_MAX_PENDING", "20"))
+# Live analyses allowed per user / per server (per minute) and for the whole bot
+# (per hour), so the bot can't burn the API quota the daily report needs.
+BOT_USER_RATE_PER_MIN = float(os.getenv("BOT_USER_RATE_PER_MIN", "3"))
+BOT_GUILD_RATE_PER_MIN = float(os.getenv("BOT_GUILD_RATE_PER_MIN", "10"))
+BOT_GLOBAL_RATE_PER_HOUR = float(os.getenv("BOT_GLOBAL_RATE_PER_HOUR", "60"))
+# Background work ($watch probes and the analyses they trigger) has its own hourly budget
+BOT_REFRESH_RATE_PER_HOUR = float(os.getenv("BOT_REFRESH_RATE_PER_HOUR", "60"))
+# How long (seconds) a finished analysis is reused before re-running it
+BOT_CACHE_TTL = int(os.getenv("BOT_CACHE_TTL", "600"))
+# Daily report snapshot: how often to look for a new log, and when it's too old to serve
+BOT_SNAPSHOT_POLL_SECONDS = int(os.getenv("BOT_SNAPSHOT_POLL_SECONDS", "60"))
+BOT_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("BOT_SNAPSHOT_MAX_AGE_HOURS", "24"))
+# $watch refresh intervals, in minutes
+BOT_WATCH_DEFAULT_INTERVAL = int(os.getenv("BOT_WATCH_DEFAULT_INTERVAL", "30"))
+BOT_WATCH_MIN_INTERVAL = int(os.getenv("BOT_WATCH_MIN_INTERVAL", "5"))
+# Most tickers one channel / the whole bot may $watch
+BOT_WATCH_MAX_PER_CHANNEL = int(os.getenv("BOT_WATCH_MAX_PER_CHANNEL", "5"))
+BOT_WATCH_MAX = int(os.getenv("BOT_WATCH_MAX", "20"))
+# Largest per-user / per-channel watchlist, since every ticker adds to the daily run
+BOT_WATCHLIST_MAX = int(os.getenv("BOT_WATCHLIST_MAX", "25"))
+
+LOADING = "⏳ Loading…"
+
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='$', intents=intents)
 
 class TradingAnalysisBot:
-    def __init__(self):
+    def __init__(self, workers=BOT_ANALYSIS_WORKERS, max_pending=BOT_MAX_PENDING, cache_ttl=BOT_CACHE_TTL):
         self.active_channels = set()
-    
-    async def analyze_ticker(self, ticker):
-        """Perform comprehensive analysis on a single ticker"""
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache_ttl = cache_ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self.work = WorkQueue(
+            self._run_job,
+            workers=workers,
+            max_pending=max_pending,
+            user_rate=(BOT_USER_RATE_PER_MIN / 60, BOT_USER_RATE_PER_MIN),
+            guild_rate=(BOT_GUILD_RATE_PER_MIN / 60, BOT_GUILD_RATE_PER_MIN),
+            global_rate=(BOT_GLOBAL_RATE_PER_HOUR / 3600, BOT_GLOBAL_RATE_PER_HOUR / 6),
+            refresh_rate=(BOT_REFRESH_RATE_PER_HOUR / 3600, BOT_REFRESH_RATE_PER_HOUR / 6),
+        )
+        self._cache = {}     # ticker -> (monotonic time, analysis)
+        self._inflight = {}  # ticker -> asyncio.Future shared by every waiter
+        self._progress = {}  # ticker -> latest partial analysis of the in-flight job
+        self._listeners = {} # ticker -> coroutine callbacks receiving partial analyses
+        self.snapshot = {}   # ticker -> signal entry from the latest daily report
+        self.snapshot_date = None
+        self.snapshot_time = None
+        self.snapshot_report = None
+        self.digest_date = None    # report date whose watchlist digests were sent
+        self._snapshot_key = None  # (path, mtime) of the loaded report
+        # ticker -> {'channels': {channel_id: minutes}, 'next_due': monotonic, 'state': {...}}
+        self.watches = {}
+
+    def load_snapshot(self, log_dir="logs"):
+        """(Re)load the latest daily report into the snapshot index; True if it changed"""
+        path = find_latest_log(log_dir)
+        if path is None:
+            return False
+        mtime = path.stat().st_mtime
+        if self._snapshot_key == (str(path), mtime):
+            return False
+        try:
+            report = load_log(path)
+        except Exception as e:
+            print(f"Error loading report snapshot {path}: {e}")
+            return False
+
+        self.snapshot = {s['ticker'].upper(): s for s in report.get('signals', []) if s.get('ticker')}
+        self.snapshot_date = report.get('date')
+        self.snapshot_report = report
+        if self.digest_date is None:
+            # Reports that predate this process were already digested
+            self.digest_date = self.snapshot_date
+        # A fresh checkout resets mtimes, so only trust mtime on the report's own day
+        modified = datetime.fromtimestamp(mtime)
+        if self.snapshot_date and modified.strftime('%Y-%m-%d') != self.snapshot_date:
+            self.snapshot_time = datetime.strptime(self.snapshot_date, '%Y-%m-%d')
+        else:
+            self.snapshot_time = modified
+        self._snapshot_key = (str(path), mtime)
+        print(f"Loaded report snapshot {path.name} ({len(self.snapshot)} tickers)")
+        return True
+
+    def snapshot_analysis(self, ticker):
+        """Build an analysis from the daily report, or None if missing or stale"""
+        signal = self.snapshot.get(ticker)
+        if not signal or self.snapshot_time is None:
+            return None
+        if datetime.now() - self.snapshot_time > timedelta(hours=BOT_SNAPSHOT_MAX_AGE_HOURS):
+            return None
+        return {
+            'ticker': ticker,
+            'price_data': signal,
+            'insider_data': signal.get('insider_data') or {},
+            'news_data': [],
+            'timestamp': self.snapshot_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'source': 'snapshot',
+            'snapshot_date': self.snapshot_date,
+            'snapshot_time': self.snapshot_time,
+        }
+
+    def known_analysis(self, ticker):
+        """Most recent analysis we have for a ticker, however old (or None)"""
+        cached = self._cache.get(ticker)
+        if cached:
+            return cached[1]
+        signal = self.snapshot.get(ticker)
+        if signal:
+            return {'ticker': ticker, 'price_data': signal, 'insider_data': signal.get('insider_data') or {}}
+        return None
+
+    def forget(self, ticker):
+        """Drop a cached analysis so the (newer) report snapshot answers next"""
+        self._cache.pop(ticker, None)
+
+    def watch(self, ticker, channel_id, interval):
+        """Subscribe a channel to a ticker; every channel shares one poll per ticker"""
+        entry = self.watches.setdefault(ticker, {'channels': {}, 'next_due': 0.0, 'state': None})
+        entry['channels'][channel_id] = interval
+        entry['next_due'] = min(entry['next_due'], time.monotonic() + interval * 60) if entry['state'] else 0.0
+
+    def unwatch(self, channel_id, ticker=None):
+        """Drop one (or every) watch of a channel; returns the tickers removed"""
+        removed = []
+        for watched in [ticker] if ticker else list(self.watches):
+            entry = self.watches.get(watched)
+            if entry and entry['channels'].pop(channel_id, None) is not None:
+                removed.append(watched)
+                if not entry['channels']:
+                    del self.watches[watched]
+        return removed
+
+    def due_watches(self):
+        now = time.monotonic()
+        return [t for t, entry in self.watches.items() if entry['next_due'] <= now]
+
+    def check_watch(self, ticker, probe):
+        """Compare a cheap probe with the last seen state; returns a reason to re-analyze, or None"""
+        entry = self.watches[ticker]
+        insider = probe['insider_data'] or {}
+        insider_key = (insider.get('last_activity'), insider.get('recent_buys'),
+                       insider.get('recent_sells'), tuple(insider.get('notable') or []))
+        previous = entry['state']
+        if previous is None:
+            known = self.known_analysis(ticker)
+            news_analysis = known['price_data'].get('news_analysis') if known else None
+        else:
+            news_analysis = previous['news_analysis']
+
+        # Re-score with the last LLM news score so only cheap inputs move the band
+        band = classify_score(build_signal(ticker, probe['price_change_pct'],
+                                           news_analysis=news_analysis, insider_data=insider)['score'])
+        entry['state'] = {
+            'headlines': set(probe['headlines']),
+            'insider_key': insider_key,
+            'band': band,
+            'news_analysis': news_analysis,
+        }
+        interval = min(entry['channels'].values())
+        entry['next_due'] = time.monotonic() + interval * 60
+
+        if previous is None:
+            return None  # first poll only sets the baseline
+        if band != previous['band']:
+            return f"signal moved {' '.join(previous['band'])} → {' '.join(band)}"
+        if set(probe['headlines']) - previous['headlines']:
+            return "new headlines"
+        if insider_key != previous['insider_key']:
+            return "new insider filings"
+        return None
+
+    def record_watch_analysis(self, ticker, analysis):
+        """Adopt a full analysis as the new watch baseline"""
+        entry = self.watches.get(ticker)
+        if entry and entry['state']:
+            price_data = analysis['price_data']
+            entry['state']['band'] = (price_data.get('signal'), price_data.get('confidence'))
+            entry['state']['news_analysis'] = price_data.get('news_analysis')
+
+    async def _run_job(self, ticker):
+        """Run one queued analysis on the executor, relaying its progress"""
+        loop = asyncio.get_running_loop()
+
+        def publish(partial):
+            loop.call_soon_threadsafe(self._publish, ticker, partial)
+
+        return await loop.run_in_executor(self.executor, self._analyze_ticker_sync, ticker, publish)
+
+    async def _run_probe(self, ticker):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, probe_ticker, ticker)
+
+    async def probe(self, ticker):
+        """Run the cheap watch probe as a background job, charged to the background rate limit
+
+        May raise RateLimitedError or QueueFullError.
+        """
+        task, _ = self.work.submit(ticker, PRIORITY_REFRESH, run=self._run_probe)
+        return await task
+
+    async def get_analysis(self, ticker, force=False, on_update=None, on_queued=None,
+                           user_id=None, guild_id=None, priority=None):
+        """Return a cached analysis or join/start the single in-flight one for this ticker
+
+        on_update, if given, is awaited with each partial analysis while the job runs;
+        on_queued is awaited with the queue position if the job can't start right away.
+        New jobs are charged to user_id/guild_id and may raise RateLimitedError or
+        QueueFullError.
+        """
+        ticker = ticker.upper()
+        if not force:
+            cached = self._cache.get(ticker)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
+            # Watchlist tickers are answered straight from the daily report
+            snapshot = self.snapshot_analysis(ticker)
+            if snapshot:
+                return snapshot
+
+        # Coalesce: everyone asking for the same ticker awaits the same job
+        task = self._inflight.get(ticker)
+        if task is None:
+            if priority is None:
+                priority = PRIORITY_ANALYZE if force else PRIORITY_MISS
+            task, position = self.work.submit(ticker, priority, user_id, guild_id)
+            self._inflight[ticker] = task
+            task.add_done_callback(lambda t, ticker=ticker: self._store_result(ticker, t))
+            if position and on_queued is not None:
+                await on_queued(position)
+
+        if on_update is not None:
+            self._listeners.setdefault(ticker, []).append(on_update)
+            # Late joiners start from whatever the job has produced so far
+            if ticker in self._progress:
+                self._notify(on_update, self._progress[ticker])
+        try:
+            # Shield so one waiter giving up doesn't cancel the job for the rest
+            return await asyncio.shield(task)
+        finally:
+            if on_update is not None:
+                listeners = self._listeners.get(ticker, [])
+                if on_update in listeners:
+                    listeners.remove(on_update)
+                if not listeners:
+                    self._listeners.pop(ticker, None)
+
+    def _publish(self, ticker, partial):
+        """Fan a partial analysis out to everyone waiting on this ticker (event loop thread)"""
+        if ticker not in self._inflight:
+            return
+        self._progress[ticker] = partial
+        for listener in list(self._listeners.get(ticker, [])):
+            self._notify(listener, partial)
+
+    @staticmethod
+    def _notify(listener, partial):
+        """Hand a partial analysis to one listener without waiting on it; its errors are logged"""
+        task = asyncio.ensure_future(listener(partial))
+        task.add_done_callback(log_listener_error)
+
+    def _store_result(self, ticker, task):
+        """Cache a finished analysis and release the in-flight slot"""
+        if self._inflight.get(ticker) is task:
+            del self._inflight[ticker]
+            self._progress.pop(ticker, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        analysis = task.result()
+        if analysis:
+            self._prune_cache()
+            self._cache[ticker] = (time.monotonic(), analysis)
+
+    def _prune_cache(self):
+        """Drop expired analyses, except for watched tickers, whose last analysis is the watch baseline"""
+        cutoff = time.monotonic() - self.cache_ttl
+        for ticker in [t for t, (stored, _) in self._cache.items() if stored < cutoff and t not in self.watches]:
+            del self._cache[ticker]
+
+    def _analyze_ticker_sync(self, ticker, publish=None):
+        """Perform comprehensive analysis on a single ticker (blocking)
+
+        Stages run cheapest first; after each one a partial analysis is handed
+        to publish() so the embed can be posted and then edited in place.
+        """
+        ticker = ticker.upper()
+        stages = {}
+        pending = ['price', 'insider', 'fundamentals', 'news']
+
+        def emit():
+            if publish:
+                publish(self._build_analysis(ticker, stages, pending))
+
         try:
             print(f"Analyzing {ticker}...")
-            
-            # Run analysis for a single ticker and extract its signal entry
-            analysis_result = analyze_tickers([ticker])
-            if not analysis_result:
-                return None
-            signals = analysis_result.get('signals', [])
-            ticker_data = next((s for s in signals if s.get('ticker') == ticker.upper()), {})
-            
-            # Get additional data
-            insider_data = get_insider_activity(ticker)
-            news_data = get_stock_news(ticker)
-            
-            return {
-                'ticker': ticker.upper(),
-                'price_data': ticker_data,
-                'insider_data': insider_data,
-                'news_data': news_data,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
+
+            stages['pct_change'] = get_price_change_pct(ticker)
+            pending.remove('price')
+            emit()
+
+            stages['insider_data'] = get_insider_activity(ticker)
+            pending.remove('insider')
+            emit()
+
+            stages['fundamentals'] = get_fundamentals(ticker)
+            pending.remove('fundamentals')
+            emit()
+
+            # The LLM stages are the slow part, so they go last
+            stages['news_data'] = get_stock_news(ticker, limit=3)
+            stages['news_analysis'] = analyze_news_with_gpt(ticker, stages['news_data'], stages['fundamentals'])
+            stages['insider_analysis'] = analyze_insider(ticker, stages['insider_data'])
+            pending.remove('news')
+
+            return self._build_analysis(ticker, stages, pending)
+
         except Exception as e:
             print(f"Error analyzing {ticker}: {e}")
             return None
+
+    def _build_analysis(self, ticker, stages, pending):
+        """Assemble the (possibly partial) analysis dict the embeds are rendered from"""
+        ticker_data = build_signal(
+            ticker,
+            stages.get('pct_change'),
+            stages.get('fundamentals'),
+            stages.get('news_analysis'),
+            stages.get('insider_data'),
+            stages.get('insider_analysis'),
+            stages.get('news_data'),
+        )
+        return {
+            'ticker': ticker,
+            'price_data': ticker_data,
+            'insider_data': stages.get('insider_data') or {},
+            'news_data': stages.get('news_data', []),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'pending': list(pending),
+        }
     
     def format_analysis_embed(self, analysis):
-        """Format analysis data into a Discord embed"""
+        """Format analysis data into a Discord embed
+
+        Stages listed in analysis['pending'] are rendered as placeholders and
+        the recommendation is marked provisional until they arrive.
+        """
         ticker = analysis['ticker']
         price_data = analysis['price_data']
         insider_data = analysis['insider_data']
+        pending = analysis.get('pending') or []
 
         # Determine recommendation using the computed score
         score = price_data.get('score', 0.0)
-        if score >= 0.5:
-            recommendation = "🟢 **BUY**"
-            color = 0x00ff00
-        elif score <= -0.5:
-            recommendation = "🔴 **SELL**"
-            color = 0xff0000
-        else:
-            recommendation = "🟡 **HOLD**"
-            color = 0xffff00
+        recommendation, color = recommendation_for(score)
+
+        description = f"**Recommendation: {recommendation}**"
+        if pending:
+            description += f" *(provisional)*\n⏳ Waiting on: {', '.join(pending)}"
 
         embed = discord.Embed(
             title=f"📈 {ticker} Analysis",
-            description=f"**Recommendation: {recommendation}**",
-            color=color,
+            description=description,
+            color=color if not pending else 0x95a5a6,
             timestamp=datetime.now()
         )
 
@@ -84,13 +411,15 @@ class TradingAnalysisBot:
                 f"**Current:** ${current_price}\n"
                 f"**Change:** {price_emoji} {price_change:.2f}%\n"
                 f"**Score:** {score:.2f}"
-            ),
+            ) if 'price' not in pending else LOADING,
             inline=True
         )
 
         # Fundamentals summary if available
         fundamentals = price_data.get('fundamentals', {})
-        if fundamentals:
+        if 'fundamentals' in pending:
+            embed.add_field(name="🏢 Fundamentals", value=LOADING, inline=True)
+        elif fundamentals:
             fundamentals_str = ", ".join(
                 f"{k}: {v}" for k, v in fundamentals.items() if v
             )[:200]
@@ -101,17 +430,20 @@ class TradingAnalysisBot:
             )
 
         # Insider Activity
+        if 'insider' in pending:
+            embed.add_field(name="🔍 Insider Activity", value=LOADING, inline=False)
         insider_buys = insider_data.get('recent_buys', 0)
         insider_sells = insider_data.get('recent_sells', 0)
         insider_emoji = "🟢" if insider_buys > insider_sells else "🔴" if insider_sells > insider_buys else "⚪"
-        embed.add_field(
-            name="🔍 Insider Activity",
-            value=(
-                f"{insider_emoji} Buys: {insider_buys} | Sells: {insider_sells}\n"
-                f"**Last Activity:** {insider_data.get('last_activity', 'N/A')}"
-            ),
-            inline=False
-        )
+        if 'insider' not in pending:
+            embed.add_field(
+                name="🔍 Insider Activity",
+                value=(
+                    f"{insider_emoji} Buys: {insider_buys} | Sells: {insider_sells}\n"
+                    f"**Last Activity:** {insider_data.get('last_activity', 'N/A')}"
+                ),
+                inline=False
+            )
 
         # Notable insider trades (limit to 3 for Discord)
         notable_trades = insider_data.get('notable', [])[:3]
@@ -128,7 +460,9 @@ class TradingAnalysisBot:
         # News Sentiment
         news_analysis = price_data.get('news_analysis', {})
         news_sentiment = news_analysis.get('sentiment_score')
-        if isinstance(news_sentiment, (int, float)):
+        if 'news' in pending:
+            embed.add_field(name="📰 News Sentiment", value="⏳ Analyzing headlines…", inline=True)
+        elif isinstance(news_sentiment, (int, float)):
             sentiment_emoji = "🟢" if news_sentiment > 0.1 else "🔴" if news_sentiment < -0.1 else "🟡"
             embed.add_field(
                 name="📰 News Sentiment",
@@ -136,14 +470,171 @@ class TradingAnalysisBot:
                 inline=True
             )
 
-        embed.set_footer(text=f"Analysis generated at {analysis['timestamp']}")
+        if analysis.get('source') == 'snapshot':
+            embed.set_footer(
+                text=f"From the {analysis['snapshot_date']} daily report ({format_age(analysis['snapshot_time'])} old) "
+                     f"• $analyze {ticker} for a live run"
+            )
+        elif pending:
+            embed.set_footer(text="Updating as data arrives…")
+        else:
+            embed.set_footer(text=f"Analysis generated at {analysis['timestamp']}")
+        return embed
+
+    def format_digest_embed(self, report, tickers):
+        """Format one subscriber's slice of the daily report"""
+        report = subset_report(report, tickers)
+        embed = discord.Embed(
+            title=f"📬 Watchlist Digest — {report.get('date')}",
+            color=0x3498db,
+            timestamp=datetime.now()
+        )
+        emojis = {"Buy": "🟢", "Sell": "🔴", "Hold": "🟡"}
+        lines = []
+        for s in report['signals']:
+            change = s.get('price_change_pct')
+            change_str = f" | Δ {change:.2f}%" if change is not None else ""
+            lines.append(f"{emojis.get(s['signal'], '⚪')} **{s['ticker']}** — {s['signal']} "
+                         f"({s['confidence']}) | Score {s['score']:.2f}{change_str}")
+        analyzed = {s['ticker'] for s in report['signals']}
+        missing = [t for t in tickers if t not in analyzed]
+        if missing:
+            lines.append(f"⏳ Not in this run yet: {', '.join(missing)}")
+        embed.description = "\n".join(lines)[:4000] or "No tickers"
+        return embed
+
+    def format_summary_embed(self, analyses):
+        """Format several analyses into one compact side-by-side embed"""
+        embed = discord.Embed(
+            title="📊 Summary",
+            color=0x3498db,
+            timestamp=datetime.now()
+        )
+        for analysis in analyses:
+            price_data = analysis['price_data']
+            score = price_data.get('score', 0.0)
+            recommendation, _ = recommendation_for(score)
+            price_change = price_data.get('price_change_pct', 0) or 0
+            embed.add_field(
+                name=analysis['ticker'],
+                value=f"{recommendation}\nScore: {score:.2f}\nΔ {price_change:.2f}%",
+                inline=True
+            )
         return embed
 
+
+def log_listener_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error updating live analysis: {task.exception()!r}")
+
+def recommendation_for(score):
+    """Map a composite score to the embed recommendation label and colour"""
+    if score >= 0.5:
+        return "🟢 **BUY**", 0x00ff00
+    if score <= -0.5:
+        return "🔴 **SELL**", 0xff0000
+    return "🟡 **HOLD**", 0xffff00
+
+def format_age(since):
+    """Human-readable age such as '3h 12m'"""
+    minutes = max(int((datetime.now() - since).total_seconds() // 60), 0)
+    hours, minutes = divmod(minutes, 60)
+    if hours >= 24:
+        return f"{hours // 24}d {hours % 24}h"
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m"
+
 trading_bot = TradingAnalysisBot()
+trading_bot.load_snapshot()
+
+@tasks.loop(seconds=BOT_SNAPSHOT_POLL_SECONDS)
+async def refresh_snapshot():
+    """Pick up a newly written daily report and send that day's watchlist digests
+
+    A same-day rewrite (an intraday re-score) instead alerts the $watch
+    channels of the tickers that changed.
+    """
+    previous = trading_bot.snapshot_report
+    changed = await asyncio.to_thread(trading_bot.load_snapshot)
+    if not changed:
+        return
+    if trading_bot.snapshot_date != trading_bot.digest_date:
+        trading_bot.digest_date = trading_bot.snapshot_date
+        await post_digests(trading_bot.snapshot_report)
+    elif previous and previous.get('date') == trading_bot.snapshot_date:
+        await alert_rescored(previous, trading_bot.snapshot_report)
+
+async def alert_rescored(previous, report):
+    """Tell watching channels about tickers whose entry changed in a re-scored report"""
+    for ticker, fields in diff_reports(previous, report)['changed'].items():
+        trading_bot.forget(ticker)
+        if ticker not in trading_bot.watches:
+            continue
+        analysis = trading_bot.snapshot_analysis(ticker)
+        if not analysis:
+            continue
+        trading_bot.record_watch_analysis(ticker, analysis)
+        embed = trading_bot.format_analysis_embed(analysis)
+        for channel_id in list(trading_bot.watches[ticker]['channels']):
+            channel = bot.get_channel(channel_id)
+            if channel is not None:
+                try:
+                    await channel.send(content=f"🔔 ${ticker} re-scored: {', '.join(fields)} changed", embed=embed)
+                except Exception as e:
+                    print(f"Error sending re-score alert for {ticker}: {e}")
+
+async def post_digests(report):
+    """Send every user and channel its own digest cut from the shared report"""
+    watchlists = await asyncio.to_thread(load_watchlists)
+    for kind, owner_id, tickers in subscriber_lists(watchlists):
+        try:
+            embed = trading_bot.format_digest_embed(report, tickers)
+            if kind == 'channels':
+                target = bot.get_channel(int(owner_id))
+            else:
+                target = bot.get_user(int(owner_id)) or await bot.fetch_user(int(owner_id))
+            if target is not None:
+                await target.send(embed=embed)
+        except Exception as e:
+            print(f"Error sending digest to {kind} {owner_id}: {e}")
+
+@tasks.loop(seconds=30)
+async def poll_watches():
+    """Run the cheap probe for every due watched ticker (once, however many channels watch it)"""
+    due = trading_bot.due_watches()
+    if due:
+        await asyncio.gather(*(refresh_watch(ticker) for ticker in due))
+
+async def refresh_watch(ticker):
+    try:
+        probe = await trading_bot.probe(ticker)
+        if ticker not in trading_bot.watches:
+            return  # unwatched while we were probing
+        reason = trading_bot.check_watch(ticker, probe)
+        if not reason:
+            return
+
+        analysis = await trading_bot.get_analysis(ticker, force=True, priority=PRIORITY_REFRESH)
+        if not analysis or ticker not in trading_bot.watches:
+            return
+        trading_bot.record_watch_analysis(ticker, analysis)
+        embed = trading_bot.format_analysis_embed(analysis)
+        for channel_id in list(trading_bot.watches[ticker]['channels']):
+            channel = bot.get_channel(channel_id)
+            if channel is not None:
+                await channel.send(content=f"🔔 ${ticker} update: {reason}", embed=embed)
+
+    except (RateLimitedError, QueueFullError) as e:
+        print(f"Skipping watch refresh for {ticker}: {e}")
+    except Exception as e:
+        print(f"Error refreshing watch for {ticker}: {e}")
 
 @bot.event
 async def on_ready():
     print(f'{bot.user} has connected to Discord!')
+    if not refresh_snapshot.is_running():
+        refresh_snapshot.start()
+    if not poll_watches.is_running():
+        poll_watches.start()
     print('Bot is ready to analyze tickers!')
 
 @bot.event
@@ -152,57 +643,231 @@ async def on_command_error(ctx, error):
     # Ignore CommandNotFound errors (these happen when users type $TICKER)
     if isinstance(error, commands.CommandNotFound):
         return
+    if isinstance(error, commands.CheckFailure):
+        await ctx.send(f"❌ {error}")
+        return
     
     # Log other errors
     print(f"Command error: {error}")
 
+class LiveEmbed:
+    """A channel message that is posted on the first update and edited on later ones"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.message = None
+        self.latest = None
+        self.final = False
+        self._lock = asyncio.Lock()
+
+    async def update(self, analysis, final=False):
+        if self.final:
+            return  # a stale partial arriving after the final render
+        self.final = final
+        self.latest = analysis
+        async with self._lock:
+            if self.latest is not analysis:
+                return  # a newer update is queued behind us; let it render instead
+            embed = trading_bot.format_analysis_embed(analysis)
+            if self.message is None:
+                self.message = await self.channel.send(embed=embed)
+            else:
+                await self.message.edit(embed=embed)
+
+async def send_analysis(channel, ticker, author=None, force=False):
+    """Analyze one ticker, streaming partial embeds into the channel; returns the analysis"""
+    live = LiveEmbed(channel)
+    guild = getattr(channel, 'guild', None)
+
+    async def on_queued(position):
+        await channel.send(f"🕒 ${ticker} queued, position {position}")
+
+    try:
+        analysis = await trading_bot.get_analysis(
+            ticker,
+            force=force,
+            on_update=live.update,
+            on_queued=on_queued,
+            user_id=getattr(author, 'id', None),
+            guild_id=guild.id if guild else None,
+        )
+        if analysis:
+            await live.update(analysis, final=True)
+        elif live.message is not None:
+            await live.message.edit(content=f"❌ Could not finish analyzing {ticker}.", embed=None)
+        else:
+            await channel.send(f"❌ Could not analyze {ticker}. Please check the ticker symbol.")
+        return analysis
+
+    except RateLimitedError as e:
+        await channel.send(f"🐢 {e.scope} rate limit reached; please try ${ticker} again in {e.retry_after:.0f}s.")
+    except QueueFullError:
+        await channel.send(f"⏳ Too many analyses in progress; please try ${ticker} again shortly.")
+    except Exception as e:
+        print(f"Error processing ticker {ticker}: {e}")
+        await channel.send(f"❌ Error analyzing {ticker}: {str(e)}")
+    return None
+
 @bot.event
 async def on_message(message):
     # Don't respond to bot messages
     if message.author == bot.user:
         return
     
+    # Commands such as $guide look like tickers; leave those to process_commands
+    first_word = message.content.split(maxsplit=1)[0] if message.content else ""
+    is_command = first_word.startswith(bot.command_prefix) and bot.get_command(first_word[1:].lower()) is not None
+
     # Check for ticker pattern (e.g., $AAPL, $TSLA, $NVDA)
     ticker_pattern = r'\$([A-Z]{1,5})\b'
-    tickers = re.findall(ticker_pattern, message.content.upper())
+    tickers = [] if is_command else re.findall(ticker_pattern, message.content.upper())
     
     if tickers:
-        # Limit to 3 tickers per message to avoid spam
-        for ticker in tickers[:3]:
-            try:
-                # Send "typing" indicator
-                async with message.channel.typing():
-                    # Perform analysis
-                    analysis = await trading_bot.analyze_ticker(ticker)
-                    
-                    if analysis:
-                        embed = trading_bot.format_analysis_embed(analysis)
-                        await message.channel.send(embed=embed)
-                    else:
-                        await message.channel.send(f"❌ Could not analyze {ticker}. Please check the ticker symbol.")
-                        
-            except Exception as e:
-                print(f"Error processing ticker {ticker}: {e}")
-                await message.channel.send(f"❌ Error analyzing {ticker}: {str(e)}")
+        # Limit to 3 tickers per message to avoid spam; analyze them concurrently
+        tickers = list(dict.fromkeys(tickers))[:3]
+        async with message.channel.typing():
+            results = await asyncio.gather(*(send_analysis(message.channel, t, message.author) for t in tickers))
+
+        analyses = [a for a in results if a]
+        if len(analyses) > 1:
+            await message.channel.send(embed=trading_bot.format_summary_embed(analyses))
     
     # Process other commands
     await bot.process_commands(message)
 
 @bot.command(name='analyze')
 async def analyze_command(ctx, ticker: str):
-    """Manually analyze a ticker with $analyze TICKER"""
+    """Force a fresh analysis of a ticker with $analyze TICKER (bypasses the cache)"""
+    async with ctx.typing():
+        await send_analysis(ctx.channel, ticker.upper(), ctx.author, force=True)
+
+def parse_interval(text):
+    """Parse '15', '15m' or '2h' into minutes"""
+    text = text.lower().strip()
+    if text.endswith('h'):
+        return int(float(text[:-1]) * 60)
+    return int(float(text.rstrip('m')))
+
+@bot.command(name='watch')
+async def watch_command(ctx, ticker: str = None, interval: str = None):
+    """Watch a ticker with $watch TICKER [interval]; list watches with $watch"""
+    if ticker is None:
+        watched = [f"${t} ({entry['channels'][ctx.channel.id]}m)"
+                   for t, entry in trading_bot.watches.items() if ctx.channel.id in entry['channels']]
+        await ctx.send("👀 Watching: " + (", ".join(watched) if watched else "nothing"))
+        return
+
+    ticker = ticker.upper().lstrip('$')
     try:
-        async with ctx.typing():
-            analysis = await trading_bot.analyze_ticker(ticker.upper())
-            
-            if analysis:
-                embed = trading_bot.format_analysis_embed(analysis)
-                await ctx.send(embed=embed)
-            else:
-                await ctx.send(f"❌ Could not analyze {ticker.upper()}. Please check the ticker symbol.")
-                
-    except Exception as e:
-        await ctx.send(f"❌ Error analyzing {ticker}: {str(e)}")
+        minutes = parse_interval(interval) if interval else BOT_WATCH_DEFAULT_INTERVAL
+    except (ValueError, OverflowError):
+        await ctx.send(f"❌ Invalid interval `{interval}`; use minutes like `15` or hours like `2h`.")
+        return
+    minutes = max(minutes, BOT_WATCH_MIN_INTERVAL)
+
+    if ctx.channel.id not in trading_bot.watches.get(ticker, {}).get('channels', {}):
+        in_channel = sum(1 for entry in trading_bot.watches.values() if ctx.channel.id in entry['channels'])
+        if in_channel >= BOT_WATCH_MAX_PER_CHANNEL:
+            await ctx.send(f"❌ A channel can watch at most {BOT_WATCH_MAX_PER_CHANNEL} tickers; `$unwatch` one first.")
+            return
+        if ticker not in trading_bot.watches and len(trading_bot.watches) >= BOT_WATCH_MAX:
+            await ctx.send(f"❌ The bot is already watching {BOT_WATCH_MAX} tickers; try again later.")
+            return
+
+    trading_bot.watch(ticker, ctx.channel.id, minutes)
+    await ctx.send(f"👀 Watching ${ticker} every {minutes}m; I'll post when the signal or its data changes.")
+
+@bot.command(name='unwatch')
+async def unwatch_command(ctx, ticker: str = None):
+    """Stop watching a ticker in this channel (or everything with no ticker)"""
+    removed = trading_bot.unwatch(ctx.channel.id, ticker.upper().lstrip('$') if ticker else None)
+    if removed:
+        await ctx.send("🛑 Stopped watching " + ", ".join(f"${t}" for t in removed))
+    else:
+        await ctx.send("Nothing to unwatch here.")
+
+@bot.group(name='watchlist', invoke_without_command=True)
+async def watchlist_command(ctx):
+    """Show your and this channel's daily-digest watchlists"""
+    watchlists = await asyncio.to_thread(load_watchlists)
+    mine = get_list(watchlists, 'users', ctx.author.id)
+    channel = get_list(watchlists, 'channels', ctx.channel.id)
+    await ctx.send(
+        f"📋 **Your list:** {', '.join(mine) or 'empty'}\n"
+        f"📋 **This channel:** {', '.join(channel) or 'empty'}\n"
+        "Use `$watchlist add/remove TICKER...` or `$watchlist channel add/remove TICKER...`"
+    )
+
+async def edit_watchlist(ctx, kind, owner_id, action, tickers):
+    tickers = [t.upper().lstrip('$') for t in tickers]
+    if action not in ('add', 'remove') or not tickers:
+        await ctx.send("Usage: `$watchlist [channel] add|remove TICKER...`")
+        return
+    watchlists = await asyncio.to_thread(load_watchlists)
+    if action == 'add':
+        if len(get_list(watchlists, kind, owner_id)) + len(tickers) > BOT_WATCHLIST_MAX:
+            await ctx.send(f"❌ Watchlists are limited to {BOT_WATCHLIST_MAX} tickers.")
+            return
+        changed = add_tickers(watchlists, kind, owner_id, tickers)
+    else:
+        changed = remove_tickers(watchlists, kind, owner_id, tickers)
+    await asyncio.to_thread(save_watchlists, watchlists)
+    verb = "Added" if action == 'add' else "Removed"
+    await ctx.send(f"✅ {verb}: {', '.join(changed) or 'nothing'}")
+
+@watchlist_command.command(name='add')
+async def watchlist_add(ctx, *tickers):
+    await edit_watchlist(ctx, 'users', ctx.author.id, 'add', tickers)
+
+@watchlist_command.command(name='remove')
+async def watchlist_remove(ctx, *tickers):
+    await edit_watchlist(ctx, 'users', ctx.author.id, 'remove', tickers)
+
+@watchlist_command.command(name='channel')
+@commands.guild_only()
+@commands.has_permissions(manage_channels=True)
+async def watchlist_channel(ctx, action: str = None, *tickers):
+    """Edit this channel's list (needs Manage Channels)"""
+    await edit_watchlist(ctx, 'channels', ctx.channel.id, action, tickers)
+
+@bot.command(name='history')
+async def history_command(ctx, ticker: str, days: int = 30):
+    """Show a ticker's daily signals from the history store with $history TICKER [days]"""
+    ticker = ticker.upper().lstrip('$')
+    start = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    rows = await asyncio.to_thread(ticker_history, ticker, start)
+    if not rows:
+        await ctx.send(f"No stored history for ${ticker} in the last {days} days.")
+        return
+    emojis = {"Buy": "🟢", "Sell": "🔴", "Hold": "🟡"}
+    lines = [f"`{r['date']}` {emojis.get(r['signal'], '⚪')} {r['signal']} ({r['confidence']}) {r['score']:+.2f}"
+             for r in rows[-30:]]
+    embed = discord.Embed(
+        title=f"🗂️ {ticker} — last {days} days",
+        description="\n".join(lines),
+        color=0x3498db
+    )
+    await ctx.send(embed=embed)
+
+@bot.command(name='profile')
+@commands.is_owner()
+async def profile_command(ctx, ticker: str):
+    """Profile one fresh analysis of a ticker, embed included, with $profile TICKER (bot owner only)"""
+    ticker = ticker.upper().lstrip('$')
+
+    def analyze_and_render():
+        analysis = trading_bot._analyze_ticker_sync(ticker)
+        if analysis:
+            trading_bot.format_analysis_embed(analysis)
+        return analysis
+
+    async with ctx.typing():
+        # threads=False because the bot outlives the profile (see profile_call)
+        analysis, path, summary = await asyncio.to_thread(
+            profile_call, analyze_and_render, name=f"bot_{ticker}", threads=False)
+    if not analysis:
+        await ctx.send(f"⚠️ Analysis of {ticker} failed; the profile covers the failed run.")
+    await ctx.send(f"```\n{summary[:1900]}\n```", file=discord.File(path))
 
 @bot.command(name='guide')
 async def guide_command(ctx):
@@ -224,7 +889,11 @@ async def guide_command(ctx):
     
     embed.add_field(
         name="🔧 Commands",
-        value="• `$analyze TICKER` - Force analysis of a ticker\n"
+        value="• `$analyze TICKER` - Force a fresh analysis of a ticker\n"
+              "• `$watch TICKER [interval]` - Post updates when a ticker changes\n"
+              "• `$unwatch [TICKER]` - Stop watching\n"
+              "• `$watchlist` - Manage your daily digest tickers\n"
+              "• `$history TICKER [days]` - Past daily signals\n"
               "• `$guide` - Show this help message\n"
               "• `$status` - Check bot status",
         inline=False
@@ -252,6 +921,15 @@ async def status_command(ctx):
     embed.add_field(name="Status", value="✅ Online", inline=True)
     embed.add_field(name="Servers", value=len(bot.guilds), inline=True)
     embed.add_field(name="Latency", value=f"{round(bot.latency * 1000)}ms", inline=True)
+
+    # Health of the data providers as seen by this process
+    icons = {'closed': '🟢', 'half-open': '🟡', 'open': '🔴'}
+    lines = []
+    for name, health in provider_health().items():
+        p95 = f", p95 {health['p95'] * 1000:.0f}ms" if health['p95'] is not None else ""
+        lines.append(f"{icons.get(health['state'], '⚪')} {name}: {health['state']}{p95}")
+    if lines:
+        embed.add_field(name="Providers", value="\n".join(lines), inline=False)
     
     await ctx.send(embed=embed)
 
@@ -1,24 +1,45 @@
 import json
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
 from pathlib import Path
-import requests
 from typing import List
 from openai import OpenAI
 from news_scraper import get_stock_news
 from insider_scraper import get_insider_activity, analyze_insider_activity_with_gpt
+from fingerprints import fingerprint, load_fingerprints, run_stage, save_fingerprints
+from cache import FUNDAMENTALS_TTL, cached
+from resilience import call_provider, http_failed, provider_get
+from tracing import span, traced
+from replay import replaying
 from config.config import ALPHA_VANTAGE_KEY, OPENAI_API_KEY
 
+# Overridable so benchmarks can point at a local stub (testing/stub_server.py);
+# the OpenAI client reads OPENAI_BASE_URL itself
+ALPHA_VANTAGE_URL = os.getenv("DST_ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+
+def alpha_vantage_failed(r):
+    """Alpha Vantage answers quota exhaustion with HTTP 200 and a "Note"/"Information" message"""
+    if http_failed(r):
+        return True
+    try:
+        data = r.json()
+    except ValueError:
+        return True
+    return "Note" in data or "Information" in data
+
+@cached("fundamentals", ttl=FUNDAMENTALS_TTL)
 def get_fundamentals(ticker):
-    url = "https://www.alphavantage.co/query"
+    url = ALPHA_VANTAGE_URL
     params = {
         "function": "OVERVIEW",
         "symbol": ticker,
         "apikey": ALPHA_VANTAGE_KEY
     }
     try:
-        r = requests.get(url, params=params, timeout=10)
+        r = provider_get("alphavantage", url, is_failure=alpha_vantage_failed, params=params, timeout=10)
         data = r.json()
         if "Symbol" in data:
             return {
@@ -32,23 +53,41 @@ def get_fundamentals(ticker):
         print(f"[ERROR] Fundamentals for {ticker}: {e}")
     return {}
 
-def get_price_change_pct(ticker):
-    url = "https://www.alphavantage.co/query"
+@cached("prices")
+def get_daily_closes(ticker):
+    """Recent daily closes as {YYYY-MM-DD: close}; also kept in the local price history"""
+    url = ALPHA_VANTAGE_URL
     params = {
         "function": "TIME_SERIES_DAILY_ADJUSTED",
         "symbol": ticker,
         "apikey": ALPHA_VANTAGE_KEY,
         "outputsize": "compact"
     }
+    r = provider_get("alphavantage", url, is_failure=alpha_vantage_failed, params=params, timeout=10)
+    data = r.json().get("Time Series (Daily)", {})
+    closes = {date: float(bar["4. close"]) for date, bar in data.items()}
+    if replaying():
+        return closes
+
+    # Imported here because history depends on this module's scoring helpers
+    from history import record_prices
+    try:
+        record_prices(ticker, closes)
+    except Exception as e:
+        print(f"Error recording price history for {ticker}: {e}")
+    return closes
+
+def price_change_from_closes(closes):
+    if len(closes) < 2:
+        return None
+    dates = sorted(closes.keys(), reverse=True)
+    last_close = closes[dates[0]]
+    prev_close = closes[dates[1]]
+    return ((last_close - prev_close) / prev_close) * 100
+
+def get_price_change_pct(ticker):
     try:
-        r = requests.get(url, params=params, timeout=10)
-        data = r.json().get("Time Series (Daily)", {})
-        if len(data) < 2:
-            return None
-        dates = sorted(data.keys(), reverse=True)
-        last_close = float(data[dates[0]]["4. close"])
-        prev_close = float(data[dates[1]]["4. close"])
-        return ((last_close - prev_close) / prev_close) * 100
+        return price_change_from_closes(get_daily_closes(ticker))
     except Exception as e:
         print(f"[ERROR] Price data for {ticker}: {e}")
     return None
@@ -59,6 +98,12 @@ WEIGHTS = {
     "insider": 0.3
 }
 
+# Score bands used by classify_score
+STRONG_BUY_THRESHOLD = 0.5
+BUY_THRESHOLD = 0.2
+SELL_THRESHOLD = -0.2
+STRONG_SELL_THRESHOLD = -0.5
+
 def score_price_change(pct):
     if pct is None: return 0
     if pct > 5: return 1.0
@@ -76,7 +121,7 @@ def analyze_news_with_gpt(ticker: str, headlines: List[str], fundamentals: dict)
             "reasoning": ""
         }
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = OpenAI(api_key=OPENAI_API_KEY, timeout=30)
 
     fundamentals_str = "\n".join(f"- {k}: {v}" for k, v in fundamentals.items() if v)
 
@@ -103,7 +148,9 @@ Respond in JSON:
 """
 
     try:
-        response = client.chat.completions.create(
+        response = call_provider(
+            "openai",
+            client.chat.completions.create,
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4
@@ -133,75 +180,218 @@ def load_tickers():
 def get_today():
     return datetime.now().strftime("%Y-%m-%d")
 
-def analyze_tickers(tickers):
+def classify_score(final_score):
+    """Map a composite score to a (signal, confidence) pair"""
+    if final_score >= STRONG_BUY_THRESHOLD:
+        return "Buy", "High"
+    if final_score >= BUY_THRESHOLD:
+        return "Buy", "Low"
+    if final_score <= STRONG_SELL_THRESHOLD:
+        return "Sell", "High"
+    if final_score <= SELL_THRESHOLD:
+        return "Sell", "Low"
+    return "Hold", "Neutral"
+
+def analyze_insider(ticker, insider_data):
+    """Get insider analysis from GPT if there are notable trades"""
+    if insider_data and insider_data.get("notable") and insider_data["notable"] != ["No notable trades"]:
+        return analyze_insider_activity_with_gpt(ticker, insider_data["notable"])
+    return {"summary": "No significant insider activity", "sentiment_score": 0}
+
+def factor_scores(entry):
+    """Per-factor scores behind a signal entry (also works for older logged entries)"""
+    return {
+        "price": score_price_change(entry.get("price_change_pct")),
+        "news": (entry.get("news_analysis") or {}).get("sentiment_score", 0) or 0,
+        "insider": score_insider_activity(entry.get("ticker"), entry.get("insider_data")),
+    }
+
+def build_signal(ticker, pct_change=None, fundamentals=None, news_analysis=None,
+                 insider_data=None, insider_analysis=None, headlines=None):
+    """Score the collected stage outputs; missing stages count as neutral"""
+    news_analysis = news_analysis or {}
+    price_score = score_price_change(pct_change)
+    news_score = news_analysis.get("sentiment_score", 0)
+    insider_score = score_insider_activity(ticker, insider_data)
+
+    final_score = (
+        WEIGHTS["price"] * price_score +
+        WEIGHTS["news"] * news_score +
+        WEIGHTS["insider"] * insider_score
+    )
+    signal, confidence = classify_score(final_score)
+
+    return {
+        "ticker": ticker,
+        "signal": signal,
+        "confidence": confidence,
+        "score": round(final_score, 3),
+        "price_change_pct": round(pct_change, 2) if pct_change is not None else None,
+        "news_analysis": news_analysis,
+        "headlines": headlines or [],
+        "insider_data": insider_data,
+        "insider_analysis": insider_analysis,
+        "fundamentals": fundamentals or {}
+    }
+
+# Seconds each stage (fetch plus LLM) may take before it is abandoned
+STAGE_BUDGETS = {
+    stage: float(os.getenv(f"DST_STAGE_BUDGET_{stage.upper()}", default))
+    for stage, default in (("fundamentals", 20), ("price", 20), ("news", 60), ("insider", 60))
+}
+MISSING = object()
+_stage_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stage")
+
+def call_with_budget(until, fn, *args, **kwargs):
+    """fn(*args, **kwargs) if it returns before monotonic time `until`, else MISSING
+
+    A late call is abandoned rather than killed: it finishes on its worker
+    thread, and whatever it fetched still lands in the disk cache.
+    """
+    remaining = until - time.monotonic()
+    if remaining <= 0:
+        return MISSING
+    future = _stage_pool.submit(traced(fn), *args, **kwargs)
+    try:
+        return future.result(timeout=remaining)
+    except FuturesTimeout:
+        return MISSING
+
+def analyze_ticker(ticker, fingerprints=None, max_age=None, deadline=None):
+    """Run every stage for one ticker and return its signal entry
+
+    With a fingerprint store (see fingerprints.py), stages whose inputs are
+    unchanged since the last run reuse their stored output. max_age lets the
+    fetchers answer from the disk cache (see cache.py) with data that old.
+
+    Each stage gets STAGE_BUDGETS seconds, cut short by `deadline` (a
+    time.monotonic() value). Stages that don't finish count as neutral and are
+    listed in the entry's "missing" field.
+    """
+    store = fingerprints if fingerprints is not None else {}
+    reused, missing = [], []
+
+    def budget(stage):
+        until = time.monotonic() + STAGE_BUDGETS[stage]
+        return until if deadline is None else min(until, deadline)
+
+    # Get fundamentals once and reuse
+    with span("stage", ticker=ticker, stage="fundamentals") as s:
+        fundamentals = call_with_budget(budget("fundamentals"), get_fundamentals, ticker)
+        if fundamentals is MISSING:
+            s.status = "timeout"
+            missing.append("fundamentals")
+            fundamentals = {}
+
+    pct_change = None
+    with span("stage", ticker=ticker, stage="price") as s:
+        try:
+            closes = call_with_budget(budget("price"), get_daily_closes, ticker, max_age=max_age)
+        except Exception as e:
+            print(f"[ERROR] Price data for {ticker}: {e}")
+            s.status = "error"
+            closes = {}
+        if closes is MISSING:
+            s.status = "timeout"
+            missing.append("price")
+        else:
+            pct_change, hit = run_stage(store, ticker, "price", fingerprint(sorted(closes.items())[-2:]),
+                                        lambda: price_change_from_closes(closes))
+            s.tag(reused=hit)
+            if hit: reused.append("price")
+
+    with span("stage", ticker=ticker, stage="news") as s:
+        until = budget("news")
+        news = call_with_budget(until, get_stock_news, ticker, limit=3, max_age=max_age)
+        news_analysis = MISSING
+        if news is not MISSING:
+            news_analysis, hit = run_stage(store, ticker, "news", fingerprint(sorted(news), fundamentals),
+                                           lambda: call_with_budget(until, analyze_news_with_gpt, ticker, news, fundamentals),
+                                           keep=lambda a: a is not MISSING and bool(a.get("reasoning")))  # fallbacks carry no reasoning
+            s.tag(reused=hit)
+            if hit: reused.append("news")
+        if news_analysis is MISSING:
+            s.status = "timeout"
+            missing.append("news")
+            news_analysis = None
+            news = [] if news is MISSING else news
+
+    # Get raw insider data first
+    with span("stage", ticker=ticker, stage="insider") as s:
+        until = budget("insider")
+        insider_data = call_with_budget(until, get_insider_activity, ticker, max_age=max_age)
+        insider_analysis = MISSING
+        if insider_data is not MISSING:
+            insider_fp = fingerprint(insider_data.get("latest_filing"), insider_data.get("notable"))
+            insider_analysis, hit = run_stage(store, ticker, "insider", insider_fp,
+                                              lambda: call_with_budget(until, analyze_insider, ticker, insider_data),
+                                              keep=lambda a: a is not MISSING and not a.get("fallback"))
+            s.tag(reused=hit)
+            if hit: reused.append("insider")
+        if insider_analysis is MISSING:
+            s.status = "timeout"
+            missing.append("insider")
+            insider_analysis = None
+            insider_data = None if insider_data is MISSING else insider_data
+
+    if reused:
+        print(f"{ticker}: inputs unchanged for {', '.join(reused)}; reusing previous output")
+    if missing:
+        print(f"{ticker}: out of time for {', '.join(missing)}; scoring them as neutral")
+    with span("stage", ticker=ticker, stage="score") as s:
+        entry = build_signal(ticker, pct_change, fundamentals, news_analysis, insider_data, insider_analysis, news)
+        s.tag(signal=entry.get("signal"), score=entry.get("score"))
+    entry["missing"] = missing
+    return entry
+
+def probe_ticker(ticker):
+    """Fetch only the cheap, LLM-free inputs used to detect that a ticker changed"""
+    return {
+        "price_change_pct": get_price_change_pct(ticker),
+        "insider_data": get_insider_activity(ticker),
+        "headlines": get_stock_news(ticker, limit=3),
+    }
+
+def analyze_tickers(tickers, reuse=True, max_age=None, time_limit=None):
+    """Analyze a universe; with reuse=False every stage re-runs (fingerprints are still refreshed)
+
+    max_age is passed to the fetchers: the daily run accepts pre-warmed data,
+    while triggered re-scores fetch live. With time_limit (seconds), stages
+    still outstanding when it runs out are abandoned, and tickers not reached
+    by then are reported with every stage missing.
+    """
     buy, sell, hold, signals = [], [], [], []
+    fingerprints = load_fingerprints()
+    store = fingerprints if reuse else {}
+    deadline = time.monotonic() + time_limit if time_limit else None
 
     for ticker in tickers:
         try:
-            # Get fundamentals once and reuse
-            fundamentals = get_fundamentals(ticker)
-            
-            pct_change = get_price_change_pct(ticker)
-            price_score = score_price_change(pct_change)
-
-            news = get_stock_news(ticker, limit=3)
-            news_analysis = analyze_news_with_gpt(ticker, news, fundamentals)
-            news_score = news_analysis.get("sentiment_score", 0)
-
-            # Get raw insider data first
-            insider_data = get_insider_activity(ticker)
-            
-            # Get insider analysis from GPT if there are notable trades
-            if insider_data and insider_data.get("notable") and insider_data["notable"] != ["No notable trades"]:
-                insider_analysis = analyze_insider_activity_with_gpt(ticker, insider_data["notable"])
-            else:
-                insider_analysis = {"summary": "No significant insider activity", "sentiment_score": 0}
-            
-            insider_score = score_insider_activity(ticker, insider_data)
-
-            final_score = (
-                WEIGHTS["price"] * price_score +
-                WEIGHTS["news"] * news_score +
-                WEIGHTS["insider"] * insider_score
-            )
-
-            if final_score >= 0.5:
-                buy.append(ticker)
-                signal = "Buy"
-                confidence = "High"
-            elif final_score >= 0.2:
-                buy.append(ticker)
-                signal = "Buy"
-                confidence = "Low"
-            elif final_score <= -0.5:
-                sell.append(ticker)
-                signal = "Sell"
-                confidence = "High"
-            elif final_score <= -0.2:
-                sell.append(ticker)
-                signal = "Sell"
-                confidence = "Low"
-            else:
-                hold.append(ticker)
-                signal = "Hold"
-                confidence = "Neutral"
-
-            signals.append({
-                "ticker": ticker,
-                "signal": signal,
-                "confidence": confidence,
-                "score": round(final_score, 3),
-                "price_change_pct": round(pct_change, 2) if pct_change is not None else None,
-                "news_analysis": news_analysis,
-                "insider_data": insider_data,
-                "insider_analysis": insider_analysis,
-                "fundamentals": fundamentals
-            })
-
+            with span("ticker", ticker=ticker):
+                entry = analyze_ticker(ticker, store, max_age, deadline)
         except Exception as e:
             print(f"Error processing {ticker}: {e}")
             continue
 
+        if entry["signal"] == "Buy":
+            buy.append(ticker)
+        elif entry["signal"] == "Sell":
+            sell.append(ticker)
+        else:
+            hold.append(ticker)
+        signals.append(entry)
+
+    incomplete = [s["ticker"] for s in signals if s["missing"]]
+    if incomplete:
+        print(f"{len(incomplete)} ticker(s) incomplete: {', '.join(incomplete)}")
+
+    if not replaying():
+        fingerprints.update(store)
+        try:
+            save_fingerprints(fingerprints)
+        except Exception as e:
+            print(f"Error saving fingerprints: {e}")
+
     return {
         "buy": buy,
         "sell": sell,
@@ -209,7 +399,33 @@ def analyze_tickers(tickers):
         "signals": signals
     }
 
+def merge_signals(report, entries):
+    """Swap re-scored entries into a report in place and regroup buy/sell/hold"""
+    by_ticker = {e["ticker"]: e for e in entries}
+    report["signals"] = [by_ticker.pop(s["ticker"], s) for s in report["signals"]] + list(by_ticker.values())
+    for side in ("buy", "sell", "hold"):
+        report[side] = [s["ticker"] for s in report["signals"] if s["signal"].lower() == side]
+    return report
+
 def save_log(report):
     Path("logs").mkdir(exist_ok=True)
     with open(f"logs/dst_{get_today()}.json", "w") as f:
         json.dump(report, f, indent=2)
+
+    # Imported here because history depends on this module's scoring helpers
+    from history import record_report
+    try:
+        record_report(report)
+    except Exception as e:
+        print(f"Error recording report history: {e}")
+
+def find_latest_log(log_dir="logs", before=None):
+    """Return the path of the most recent daily report (older than date `before`, if given)"""
+    paths = sorted(Path(log_dir).glob("dst_*.json"))
+    if before:
+        paths = [p for p in paths if p.stem[len("dst_"):] < before]
+    return paths[-1] if paths else None
+
+def load_log(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,66 @@
+"""
+Per-ticker, per-stage input fingerprints, for incremental daily runs.
+
+Stored in data/fingerprints.json as
+    {"<TICKER>": {"<stage>": {"fp": "<sha1 of the stage's inputs>", "output": ...}}}
+
+A stage whose inputs hash the same as last run reuses its stored output
+instead of running again. A stage's fingerprint covers everything it reads
+(the news stage hashes the fundamentals too), so a change only re-runs the
+stages that depend on it:
+
+    fundamentals ────┐
+    headlines ───────┴─> news (LLM) ──┐
+    insider filings ───> insider (LLM) ┼─> score
+    last two price bars ─> price ─────┘
+
+The score itself is cheap and is always recomputed from the stage outputs.
+
+Bump FINGERPRINT_VERSION when a stage's prompt or logic changes to
+invalidate every stored output.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+FINGERPRINTS_PATH = os.getenv("DST_FINGERPRINTS_PATH", "data/fingerprints.json")
+FINGERPRINT_VERSION = 1
+
+
+def fingerprint(*inputs):
+    """Stable hash of JSON-serializable stage inputs"""
+    blob = json.dumps([FINGERPRINT_VERSION, *inputs], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def load_fingerprints(path=FINGERPRINTS_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_fingerprints(store, path=FINGERPRINTS_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(store, f)
+    os.replace(tmp, path)
+
+
+def run_stage(store, ticker, stage, fp, compute, keep=None):
+    """Return (output, reused) for one stage, computing it only when `fp` changed
+
+    Outputs for which keep(output) is false (e.g. an LLM fallback after an
+    API error) are returned but not stored, so the next run tries again.
+    """
+    stages = store.setdefault(ticker, {})
+    previous = stages.get(stage)
+    if previous and previous["fp"] == fp:
+        return previous["output"], True
+    output = compute()
+    if keep is None or keep(output):
+        stages[stage] = {"fp": fp, "output": output}
+    return output, False
@@ -0,0 +1,203 @@
+"""
+Indexed history of daily signals.
+
+Every saved report is also written here, one row per (ticker, date) with the
+headline fields and per-factor scores as columns and the full signal entry as
+JSON, so time-series questions ("MSFT's score over the last 60 days") are an
+index lookup instead of parsing every file in logs/.
+
+Backfill from existing logs with:
+    python src/history.py import
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import csv
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dst_agent import factor_scores
+from log_archive import ARCHIVE_DIR, iter_reports
+
+HISTORY_PATH = os.getenv("DST_HISTORY_PATH", "data/history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    signal TEXT,
+    confidence TEXT,
+    score REAL,
+    price_change_pct REAL,
+    price_score REAL,
+    news_score REAL,
+    insider_score REAL,
+    position INTEGER,       -- order within the day's report
+    payload TEXT NOT NULL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_by_date ON signals (date, ticker);
+CREATE INDEX IF NOT EXISTS signals_by_signal ON signals (signal, confidence, date);
+CREATE INDEX IF NOT EXISTS signals_by_score ON signals (score);
+
+-- Local daily close history, for backtests
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL NOT NULL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_date ON prices (date, ticker);
+
+-- Report-level fields (buy/sell/hold lists, news, insider lines) without the signals
+CREATE TABLE IF NOT EXISTS reports (
+    date TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+"""
+
+COLUMNS = ("ticker", "date", "signal", "confidence", "score", "price_change_pct",
+           "price_score", "news_score", "insider_score")
+
+
+def connect(path=HISTORY_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _signal_row(date, position, s):
+    factors = factor_scores(s)
+    return (
+        s["ticker"], date, s.get("signal"), s.get("confidence"), s.get("score"),
+        s.get("price_change_pct"), factors["price"], factors["news"], factors["insider"],
+        position, json.dumps(s),
+    )
+
+
+def record_report(report, conn=None, path=HISTORY_PATH):
+    """Upsert one report's signals (and report-level fields) into the store"""
+    own = conn is None
+    if own:
+        conn = connect(path)
+    date = report["date"]
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_signal_row(date, i, s) for i, s in enumerate(report.get("signals", [])) if s.get("ticker")],
+        )
+        rest = {k: v for k, v in report.items() if k != "signals"}
+        conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?)", (date, json.dumps(rest)))
+    if own:
+        conn.close()
+
+
+def record_prices(ticker, closes, conn=None, path=HISTORY_PATH):
+    """Upsert {date: close} for one ticker"""
+    own = conn is None
+    if own:
+        conn = connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO prices VALUES (?, ?, ?)",
+            [(ticker.upper(), date, close) for date, close in closes.items()],
+        )
+    if own:
+        conn.close()
+
+
+def import_prices(csv_path, path=HISTORY_PATH):
+    """Load a ticker,date,close CSV (with header) into the price history; returns rows loaded"""
+    conn = connect(path)
+    with open(csv_path, newline="") as f:
+        rows = [(r["ticker"].upper(), r["date"], float(r["close"])) for r in csv.DictReader(f)]
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?)", rows)
+    conn.close()
+    return len(rows)
+
+
+def import_logs(log_dir="logs", path=HISTORY_PATH, archive_dir=ARCHIVE_DIR):
+    """Backfill the store from archived months and logs/dst_*.json; returns the number of reports imported"""
+    conn = connect(path)
+    count = 0
+    for report in iter_reports(log_dir, archive_dir):
+        try:
+            record_report(report, conn)
+            count += 1
+        except Exception as e:
+            print(f"Error importing report for {report.get('date')}: {e}")
+    conn.close()
+    return count
+
+
+def ticker_history(ticker, start=None, end=None, full=False, path=HISTORY_PATH):
+    """Rows for one ticker in date order, optionally bounded by ISO dates (inclusive)
+
+    Each row is a dict of the indexed columns; with full=True it also carries
+    the complete signal entry under "entry".
+    """
+    conn = connect(path)
+    query = f"SELECT {', '.join(COLUMNS)}, payload FROM signals WHERE ticker = ?"
+    params = [ticker.upper()]
+    if start:
+        query += " AND date >= ?"
+        params.append(start)
+    if end:
+        query += " AND date <= ?"
+        params.append(end)
+    rows = conn.execute(query + " ORDER BY date", params).fetchall()
+    conn.close()
+
+    history = []
+    for row in rows:
+        entry = dict(zip(COLUMNS, row[:-1]))
+        if full:
+            entry["entry"] = json.loads(row[-1])
+        history.append(entry)
+    return history
+
+
+def load_report(date, path=HISTORY_PATH):
+    """Reassemble the full report for a date, or None if it isn't stored"""
+    conn = connect(path)
+    row = conn.execute("SELECT payload FROM reports WHERE date = ?", (date,)).fetchone()
+    signals = [json.loads(p) for (p,) in conn.execute(
+        "SELECT payload FROM signals WHERE date = ? ORDER BY position", (date,))] if row else []
+    conn.close()
+    if row is None:
+        return None
+    report = json.loads(row[0])
+    report["signals"] = signals
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signal history store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="backfill from daily JSON logs")
+    imp.add_argument("log_dir", nargs="?", default="logs")
+    imp_prices = sub.add_parser("import-prices", help="load daily closes from a ticker,date,close CSV")
+    imp_prices.add_argument("csv_path")
+    show = sub.add_parser("show", help="print a ticker's recent history")
+    show.add_argument("ticker")
+    show.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"Imported {import_logs(args.log_dir)} report(s) into {HISTORY_PATH}")
+    elif args.command == "import-prices":
+        print(f"Imported {import_prices(args.csv_path)} price row(s) into {HISTORY_PATH}")
+    else:
+        start = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+        for row in ticker_history(args.ticker, start=start):
+            print(f"{row['date']}  {row['signal']:<4} {row['confidence']:<7} score={row['score']}")
+
+
+if __name__ == "__main__":
+    main()
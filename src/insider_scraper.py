@@ -7,6 +7,10 @@ import json
 import time
 from datetime import datetime
 from openai import OpenAI
+from cache import cached
+from resilience import call_provider, http_failed
+
+SEC_API_URL = os.getenv("DST_SEC_API_URL", "https://api.sec-api.io")
 
 def get_company_cik(ticker):
     """Get CIK for a company ticker symbol"""
@@ -40,6 +44,7 @@ def get_company_cik(ticker):
     
     return cik_mappings.get(ticker.upper())
 
+@cached("insider")
 def get_insider_transactions(ticker, limit=50):
     """Fetch insider trading data for a given ticker using SEC API"""
     
@@ -48,7 +53,7 @@ def get_insider_transactions(ticker, limit=50):
         return []
     
     # Use the correct SEC API endpoint for insider trading
-    url = "https://api.sec-api.io/insider-trading"
+    url = f"{SEC_API_URL}/insider-trading"
     
     headers = {
         'Authorization': SEC_API_KEY,
@@ -65,7 +70,8 @@ def get_insider_transactions(ticker, limit=50):
     
     try:
         print(f"Fetching insider data for {ticker} from SEC API...")
-        response = requests.post(url, headers=headers, json=payload)
+        response = call_provider("sec", requests.post, url, headers=headers, json=payload, timeout=15,
+                                 is_failure=http_failed)
         
         print(f"Response status: {response.status_code}")
         
@@ -155,6 +161,7 @@ def parse_insider_data(transactions):
                     'price_per_share': price,
                     'total_value': shares * price if shares and price else 0,
                     'filed_date': transaction.get('filedAt', '')[:10] if transaction.get('filedAt') else '',
+                    'accession_no': transaction.get('accessionNo', ''),
                     'acquired_disposed': acquired_disposed
                 })
                 
@@ -165,9 +172,42 @@ def parse_insider_data(transactions):
     print(f"Parsed {len(parsed_data)} insider transactions")
     return parsed_data
 
-def get_insider_activity(ticker):
-    """Get insider trading activity for a given ticker"""
-    insider_data = get_insider_transactions(ticker)
+def get_recent_filings(tickers, since, limit=50):
+    """Insider filings for any of `tickers` filed since `since` (ISO date or timestamp), newest first
+
+    One query covers the whole list, so watching a universe for new filings
+    costs a single request per poll rather than one per ticker.
+    """
+    if not SEC_API_KEY or not tickers:
+        return []
+
+    url = f"{SEC_API_URL}/insider-trading"
+    headers = {
+        'Authorization': SEC_API_KEY,
+        'Content-Type': 'application/json'
+    }
+    payload = {
+        "query": f"issuer.tradingSymbol:({' OR '.join(t.upper() for t in tickers)}) AND filedAt:[{since} TO *]",
+        "from": "0",
+        "size": str(min(limit, 50)),
+        "sort": [{"filedAt": {"order": "desc"}}]
+    }
+
+    response = call_provider("sec", requests.post, url, headers=headers, json=payload, timeout=15,
+                             is_failure=http_failed)
+    response.raise_for_status()
+    return [
+        {
+            "ticker": (t.get('issuer') or {}).get('tradingSymbol', '').upper(),
+            "accession_no": t.get('accessionNo', ''),
+            "filed_at": t.get('filedAt', ''),
+        }
+        for t in response.json().get("transactions", [])
+    ]
+
+def get_insider_activity(ticker, max_age=None):
+    """Get insider trading activity for a given ticker (max_age: accept cached filings this old)"""
+    insider_data = get_insider_transactions(ticker, max_age=max_age)
     
     if not insider_data:
         return {
@@ -175,6 +215,8 @@ def get_insider_activity(ticker):
             "recent_buys": 0,
             "recent_sells": 0,
             "last_activity": "N/A",
+            "latest_filing": None,
+            "filings": [],
             "notable": ["No insider data available"],
         }
     
@@ -209,6 +251,8 @@ def get_insider_activity(ticker):
         "recent_buys": buys,
         "recent_sells": sells,
         "last_activity": latest_date or "N/A",
+        "latest_filing": insider_data[0].get('accession_no'),  # results are sorted newest filing first
+        "filings": list(dict.fromkeys(t['accession_no'] for t in insider_data if t.get('accession_no'))),
         "notable": notable[:5] if notable else ["No notable trades"],  # Limit to 5 most notable
     }
 
@@ -217,10 +261,11 @@ def analyze_insider_activity_with_gpt(ticker, trades):
     if not OPENAI_API_KEY:
         return {
             "summary": f"Recent insider activity for {ticker}: {len(trades)} notable trades",
-            "sentiment_score": 0.0
+            "sentiment_score": 0.0,
+            "fallback": True,  # no GPT analysis behind it; not worth keeping
         }
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = OpenAI(api_key=OPENAI_API_KEY, timeout=30)
     
     prompt = f"""
 You are an insider trading analyst.
@@ -239,7 +284,9 @@ Return your response in this JSON format:
 """
 
     try:
-        response = client.chat.completions.create(
+        response = call_provider(
+            "openai",
+            client.chat.completions.create,
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4
@@ -251,5 +298,6 @@ Return your response in this JSON format:
         print(f"Error analyzing insider activity with GPT: {e}")
         return {
             "summary": f"Recent insider activity for {ticker}: {len(trades)} notable trades",
-            "sentiment_score": 0.0
+            "sentiment_score": 0.0,
+            "fallback": True,  # no GPT analysis behind it; not worth keeping
         }
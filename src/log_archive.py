@@ -0,0 +1,222 @@
+"""
+Compressed, seekable archive for old daily reports.
+
+Each month of logs/dst_YYYY-MM-DD.json files compacts into
+logs/archive/dst_YYYY-MM.ndjson.gz plus a small dst_YYYY-MM.idx.json:
+
+* one JSON line per (ticker, date) holding that day's signal entry, plus a
+  "_report" line per date with the report-level fields (buy/sell/hold, news,
+  insider lines);
+* lines are grouped by ticker and every ticker's block is its own gzip
+  member, so the file still streams with zcat / gzip.open;
+* the index maps each ticker to the byte offset and length of its member, so
+  reading one ticker's history seeks to it and decompresses only that block.
+
+    python src/log_archive.py compact [--keep-months 1] [--delete]
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from dst_agent import find_latest_log, load_log
+
+ARCHIVE_DIR = "logs/archive"
+REPORT_KEY = "_report"
+
+
+def archive_paths(month, archive_dir=ARCHIVE_DIR):
+    base = Path(archive_dir) / f"dst_{month}"
+    return base.with_suffix(".ndjson.gz"), base.with_suffix(".idx.json")
+
+
+def load_index(index_path):
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def write_archive(reports, month, archive_dir=ARCHIVE_DIR):
+    """Write one month of reports as a per-ticker gzip-member archive plus its index"""
+    data_path, index_path = archive_paths(month, archive_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    by_ticker = defaultdict(list)
+    order = {}
+    fields = {}
+    for report in sorted(reports, key=lambda r: r["date"]):
+        date = report["date"]
+        order[date] = [s["ticker"] for s in report.get("signals", [])]
+        fields[date] = list(report)
+        by_ticker[REPORT_KEY].append({"date": date, **{k: v for k, v in report.items() if k != "signals"}})
+        for s in report.get("signals", []):
+            by_ticker[s["ticker"]].append({"date": date, **s})
+
+    index = {"month": month, "dates": sorted(order), "order": order, "fields": fields, "tickers": {}}
+    tmp_path = data_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        for ticker in sorted(by_ticker):
+            lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in by_ticker[ticker])
+            member = gzip.compress(lines.encode(), compresslevel=9, mtime=0)
+            index["tickers"][ticker] = [f.tell(), len(member), len(by_ticker[ticker])]
+            f.write(member)
+    os.replace(tmp_path, data_path)
+    with open(index_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    return data_path
+
+
+def read_ticker(ticker, month, archive_dir=ARCHIVE_DIR):
+    """One ticker's records for a month, decompressing only that ticker's block"""
+    data_path, index_path = archive_paths(month, archive_dir)
+    entry = load_index(index_path)["tickers"].get(ticker if ticker == REPORT_KEY else ticker.upper())
+    if entry is None:
+        return []
+    offset, length, _ = entry
+    with open(data_path, "rb") as f:
+        f.seek(offset)
+        block = gzip.decompress(f.read(length))
+    return [json.loads(line) for line in block.splitlines()]
+
+
+def iter_records(month, archive_dir=ARCHIVE_DIR):
+    """Stream every record of a month without loading the whole archive"""
+    data_path, _ = archive_paths(month, archive_dir)
+    with gzip.open(data_path, "rt") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def archived_months(archive_dir=ARCHIVE_DIR):
+    return sorted(p.name[len("dst_"):-len(".idx.json")] for p in Path(archive_dir).glob("dst_*.idx.json"))
+
+
+def ticker_records(ticker, archive_dir=ARCHIVE_DIR):
+    """A ticker's records across every archived month, in date order"""
+    records = []
+    for month in archived_months(archive_dir):
+        records.extend(read_ticker(ticker, month, archive_dir))
+    return records
+
+
+def load_month(month, archive_dir=ARCHIVE_DIR):
+    """Reassemble every report of an archived month, keyed by date"""
+    index = load_index(archive_paths(month, archive_dir)[1])
+    reports = {}
+    signals = defaultdict(dict)
+    for record in iter_records(month, archive_dir):
+        date = record.pop("date")
+        if date not in index["order"]:
+            continue
+        if "ticker" not in record:
+            reports[date] = {"date": date, **record}
+        else:
+            signals[date][record["ticker"]] = record
+    for date, report in reports.items():
+        report["signals"] = [signals[date][t] for t in index["order"][date] if t in signals[date]]
+        reports[date] = {k: report[k] for k in index["fields"][date] if k in report}
+    return reports
+
+
+def load_report(date, archive_dir=ARCHIVE_DIR):
+    """One archived day's full report, or None"""
+    month = date[:7]
+    if month not in archived_months(archive_dir):
+        return None
+    return load_month(month, archive_dir).get(date)
+
+
+def latest_report(before=None, log_dir="logs", archive_dir=ARCHIVE_DIR):
+    """The most recent report older than `before`, from loose logs or, failing that, the archive"""
+    path = find_latest_log(log_dir, before=before)
+    if path:
+        return load_log(path)
+    for month in reversed(archived_months(archive_dir)):
+        if before and month > before[:7]:
+            continue
+        dates = [d for d in load_index(archive_paths(month, archive_dir)[1])["dates"]
+                 if not before or d < before]
+        if dates:
+            return load_month(month, archive_dir)[dates[-1]]
+    return None
+
+
+def iter_reports(log_dir="logs", archive_dir=ARCHIVE_DIR):
+    """Every report, archived months first and then loose JSON logs, in date order"""
+    seen = set()
+    for month in archived_months(archive_dir):
+        for date, report in sorted(load_month(month, archive_dir).items()):
+            seen.add(date)
+            yield report
+    for path in sorted(Path(log_dir).glob("dst_*.json")):
+        if path.stem[len("dst_"):] in seen:
+            continue
+        try:
+            report = load_log(path)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        yield report
+
+
+def compact(log_dir="logs", archive_dir=ARCHIVE_DIR, keep_months=1, delete=False):
+    """Fold daily JSON logs older than the newest `keep_months` months into monthly archives
+
+    Months that already have an archive are merged rather than overwritten.
+    Originals are only deleted (with delete=True) after the archive reads back
+    identically. Returns the list of months written.
+    """
+    current = datetime.now().strftime("%Y-%m")
+    by_month = defaultdict(list)
+    for path in sorted(Path(log_dir).glob("dst_*.json")):
+        by_month[path.stem[len("dst_"):][:7]].append(path)
+
+    recent = sorted({current, *by_month})[-keep_months:] if keep_months else []
+    written = []
+    for month, paths in sorted(by_month.items()):
+        if month in recent:
+            continue
+        reports = load_month(month, archive_dir) if month in archived_months(archive_dir) else {}
+        for path in paths:
+            report = load_log(path)
+            reports[report["date"]] = report
+        write_archive(list(reports.values()), month, archive_dir)
+
+        if delete:
+            restored = load_month(month, archive_dir)
+            for path in paths:
+                report = load_log(path)
+                if restored.get(report["date"]) == report:
+                    path.unlink()
+                else:
+                    print(f"Archive mismatch for {path.name}; keeping the original")
+        written.append(month)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed daily log archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    comp = sub.add_parser("compact", help="convert daily JSON logs into monthly archives")
+    comp.add_argument("--log-dir", default="logs")
+    comp.add_argument("--keep-months", type=int, default=1,
+                      help="newest months to leave as plain JSON (default: the current one)")
+    comp.add_argument("--delete", action="store_true", help="remove JSON logs once archived and verified")
+    show = sub.add_parser("show", help="print a ticker's archived records")
+    show.add_argument("ticker")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        months = compact(args.log_dir, keep_months=args.keep_months, delete=args.delete)
+        print(f"Compacted {len(months)} month(s): {', '.join(months) or 'none'}")
+    else:
+        for record in ticker_records(args.ticker):
+            print(f"{record['date']}  {record['signal']:<4} {record['confidence']:<7} score={record['score']}")
+
+
+if __name__ == "__main__":
+    main()
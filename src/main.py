@@ -2,27 +2,91 @@ import os, sys
 # Ensure project root is on sys.path so 'config' and sibling packages resolve
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import argparse
+import json
+from pathlib import Path
 from dst_agent import load_tickers, analyze_tickers, save_log, get_today
-from send_report import send_to_discord
+from cache import CACHE_MAX_AGE, bypass
+from log_archive import latest_report
+from send_report import queue_report
 from news_scraper import get_stock_news
-from insider_scraper import get_insider_activity
+from watchlists import load_watchlists, all_tickers, subscriber_lists, top_movers, subset_report
+from tracing import finish_trace, start_trace
+from profiling import profile_call
+import replay
 
-def main():
-    tickers = load_tickers()
-    result = analyze_tickers(tickers)
+RUN_DEADLINE_MINUTES = float(os.getenv("DST_RUN_DEADLINE_MINUTES", "30"))
+BACKFILL_MINUTES = float(os.getenv("DST_BACKFILL_MINUTES", "10"))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the daily DST analysis")
+    parser.add_argument("--full-report", action="store_true",
+                        help="send every ticker in detail instead of only what changed since the last report")
+    parser.add_argument("--recompute", action="store_true",
+                        help="re-run every stage even where its inputs are unchanged since the last run")
+    parser.add_argument("--deadline-minutes", type=float, default=RUN_DEADLINE_MINUTES,
+                        help="send the report with whatever finished after this long (0 waits for everything)")
+    parser.add_argument("--backfill-minutes", type=float, default=BACKFILL_MINUTES,
+                        help="time allowed afterwards to complete unfinished tickers as a follow-up update (0 skips it)")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under cProfile and write a .prof file and summary to logs/profiles/")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", nargs="?", const=replay.default_path(), metavar="ARCHIVE",
+                      help="capture every provider response to a replay archive (default: %(const)s)")
+    mode.add_argument("--replay", metavar="ARCHIVE",
+                      help="serve provider responses from a recorded archive instead of the network; "
+                           "the report goes to logs/replay/, nothing is queued and data/ is left as it was")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Every provider call, cache lookup and stage is timed; the trace lands in
+    # logs/traces/ and the metrics in DST_METRICS_TEXTFILE, failed runs included
+    start_trace("daily")
+    totals = {}
+    if args.record or args.replay:
+        # Every fetch must reach the transport to be captured or served, so
+        # neither the cache nor reused stage outputs can stand in for one
+        bypass()
+        args.recompute = True
+        if args.record:
+            replay.record(args.record)
+        else:
+            replay.replay(args.replay)
+    try:
+        if args.profile:
+            profile_call(run, args, totals, name="daily")
+        else:
+            run(args, totals)
+    finally:
+        replay.stop()
+        finish_trace(**totals)
+
+def run(args, totals):
+    base_tickers = load_tickers()
+    watchlists = load_watchlists()
+
+    # Analyze every distinct ticker across the global list and all watchlists once
+    tickers = all_tickers(base_tickers, watchlists)
+    # Accept data pre-warmed ahead of the run (python src/cache.py prewarm)
+    result = analyze_tickers(tickers, reuse=not args.recompute, max_age=CACHE_MAX_AGE,
+                             time_limit=args.deadline_minutes * 60)
+
+    # Top 2 buys/sells for each subscriber, fetched once per distinct ticker
+    movers = dict.fromkeys(top_movers(result, base_tickers))
+    for _, _, subscriber_tickers in subscriber_lists(watchlists):
+        movers.update(dict.fromkeys(top_movers(result, subscriber_tickers)))
 
-    # Get top 3 tickers from buy/sell for news
-    top_movers = result["buy"][:2] + result["sell"][:2]
-    
     # Get news for top movers
     news_dict = {}
-    for ticker in top_movers:
-        news_dict[ticker] = get_stock_news(ticker)
+    for ticker in movers:
+        news_dict[ticker] = get_stock_news(ticker, max_age=CACHE_MAX_AGE)
 
-    # Get insider activity for all top movers
+    # Insider activity for top movers comes from the data analyze_tickers already fetched
+    signals = {s["ticker"]: s for s in result["signals"]}
     insider_activities = []
-    for ticker in top_movers:
-        insider_data = get_insider_activity(ticker)  # Get raw data
+    for ticker in movers:
+        insider_data = signals[ticker].get("insider_data")
         if insider_data and insider_data.get("notable") and insider_data["notable"] != ["No notable trades"]:
             insider_activities.extend(insider_data["notable"])
 
@@ -34,8 +98,42 @@ def main():
         "insider_activity": insider_activities
     }
 
+    previous_report = None if args.full_report else latest_report(before=report["date"])
+    previous = subset_report(previous_report, base_tickers) if previous_report else None
+
+    if args.replay:
+        # A replayed run must not overwrite today's report and history or reach Discord
+        path = Path("logs/replay") / f"dst_{report['date']}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+        print(f"Replayed report written to {path}")
+        return
+
     save_log(report)
-    send_to_discord(report)
+    # The webhook report covers the global list; watchlist digests are posted by the bot.
+    # Delivery happens out of band (python src/outbox.py) so a slow Discord can't hold up the run.
+    queue_report(subset_report(report, base_tickers), previous)
+
+    incomplete = {s["ticker"]: s["missing"] for s in report["signals"] if s.get("missing")}
+    totals.update(tickers=len(tickers), scored_tickers=len(report["signals"]), incomplete_tickers=len(incomplete))
+    if incomplete and args.backfill_minutes:
+        backfill(report, incomplete, args.backfill_minutes * 60)
+
+def backfill(report, incomplete, time_limit):
+    """Retry unfinished tickers and queue whatever improved as a follow-up update
+
+    Stages abandoned at the deadline keep running, and their fetches land in
+    the cache, so the retry mostly reads warm data.
+    """
+    # Imported here because the scheduler itself runs this script
+    from scheduler import publish_update
+
+    print(f"Back-filling {len(incomplete)} incomplete ticker(s)")
+    retry = analyze_tickers(list(incomplete), max_age=CACHE_MAX_AGE, time_limit=time_limit)
+    improved = [s for s in retry["signals"] if len(s["missing"]) < len(incomplete[s["ticker"]])]
+    if improved:
+        publish_update(report, improved, drain=False)
+    print(f"Back-fill completed {len(improved)} of {len(incomplete)} ticker(s)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
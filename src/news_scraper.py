@@ -1,10 +1,38 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import feedparser
+from cache import cached
+from resilience import provider_get
+
+NEWS_FEED_URL = os.getenv("DST_NEWS_FEED_URL", "https://news.google.com/rss/search")
+
+def feed_url(ticker):
+    return f"{NEWS_FEED_URL}?q={ticker}+stock&hl=en-US&gl=US&ceid=US:en"
+
+def fetch_feed(ticker, etag=None, modified=None):
+    """Conditional GET of a ticker's news feed
+
+    Returns (headlines, etag, modified); headlines is None when the server
+    answers 304 Not Modified for the given validators.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    r = provider_get("news", feed_url(ticker), headers=headers, timeout=10)
+    if r.status_code == 304:
+        return None, etag, modified
+    r.raise_for_status()
+    feed = feedparser.parse(r.content)
+    return [entry.title for entry in feed.entries], r.headers.get("ETag"), r.headers.get("Last-Modified")
 
+@cached("news")
 def get_stock_news(ticker, limit=3):
     try:
-        feed_url = f"https://news.google.com/rss/search?q={ticker}+stock&hl=en-US&gl=US&ceid=US:en"
-        feed = feedparser.parse(feed_url)
-        return [entry.title for entry in feed.entries[:limit]]
+        headlines, _, _ = fetch_feed(ticker)
+        return headlines[:limit]
     except Exception as e:
         print(f"Error fetching news for {ticker}: {e}")
         return []
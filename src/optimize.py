@@ -0,0 +1,139 @@
+"""
+Parallel search over scoring weights and buy/sell thresholds.
+
+Loads the backtest panel once, writes the factor and forward-return arrays
+to .npy files and has every worker memory-map them read-only, so the arrays
+are shared through the page cache instead of being pickled to each process.
+Candidates (grid or random) are evaluated in batches across a process pool
+with backtest.evaluate, and the ranked results are written to a CSV.
+Candidates that fire fewer than --min-signals signals are dropped before
+ranking; a handful of lucky trades would otherwise top the list.
+
+    python src/optimize.py --mode random --samples 2000 --horizon 5
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import csv
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from backtest import FACTORS, evaluate, forward_returns, horizon_arg, load_panel
+
+MIN_SIGNALS = 30
+
+# Worker-side views of the shared arrays, set up once per process
+_factors = None
+_fwd = None
+
+
+def _init_worker(factors_path, fwd_path):
+    global _factors, _fwd
+    _factors = np.load(factors_path, mmap_mode="r")
+    _fwd = np.load(fwd_path, mmap_mode="r")
+
+
+def _evaluate_batch(batch, horizon):
+    results = []
+    for weights, buy, sell in batch:
+        metrics = evaluate(_factors, _fwd, weights, buy, sell, horizon=horizon)
+        results.append({**dict(zip(FACTORS, weights)), "buy": buy, "sell": sell, **metrics})
+    return results
+
+
+def grid_candidates(step=0.1, buys=(0.1, 0.2, 0.3, 0.4), sells=(-0.1, -0.2, -0.3, -0.4)):
+    """Every weight vector on the simplex at `step` resolution, crossed with the thresholds"""
+    n = round(1 / step)
+    weights = [(a * step, b * step, (n - a - b) * step)
+               for a in range(n + 1) for b in range(n + 1 - a)]
+    return [(w, buy, sell) for w, buy, sell in itertools.product(weights, buys, sells)]
+
+
+def random_candidates(samples, seed=None, buy_range=(0.05, 0.6), sell_range=(-0.6, -0.05)):
+    """Dirichlet-sampled weights with uniform thresholds"""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(len(FACTORS)), samples)
+    buys = rng.uniform(*buy_range, samples)
+    sells = rng.uniform(*sell_range, samples)
+    return [(tuple(w), float(b), float(s)) for w, b, s in zip(weights, buys, sells)]
+
+
+def optimize(candidates, horizon=5, rank_by="sharpe", workers=None, batch_size=50,
+             start=None, end=None, panel=None, min_signals=MIN_SIGNALS):
+    """Evaluate candidates in parallel; returns result dicts with at least min_signals signals, best first"""
+    _, _, factors, closes = panel or load_panel(start, end)
+    if factors.size == 0:
+        return []
+    fwd = forward_returns(closes, horizon)
+
+    with tempfile.TemporaryDirectory(prefix="dst_optimize_") as tmp:
+        factors_path = Path(tmp) / "factors.npy"
+        fwd_path = Path(tmp) / "fwd.npy"
+        np.save(factors_path, factors)
+        np.save(fwd_path, fwd)
+        del factors, closes, fwd
+
+        batches = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(factors_path), str(fwd_path))) as pool:
+            for batch_results in pool.map(_evaluate_batch, batches, itertools.repeat(horizon)):
+                results.extend(batch_results)
+
+    results = [r for r in results if r["signals"] >= min_signals]
+    # NaN metrics (e.g. no trades) sort last
+    return sorted(results, key=lambda r: (np.isnan(r[rank_by]), -np.nan_to_num(r[rank_by])))
+
+
+def write_results(results, path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["rank", *results[0].keys()])
+        writer.writeheader()
+        for rank, row in enumerate(results, 1):
+            writer.writerow({"rank": rank, **{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items()}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search scoring weights and thresholds over stored history")
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid")
+    parser.add_argument("--step", type=float, default=0.1, help="grid weight resolution")
+    parser.add_argument("--samples", type=int, default=1000, help="random candidates to draw")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--horizon", type=horizon_arg, default=5)
+    parser.add_argument("--rank-by", default="sharpe",
+                        choices=["sharpe", "hit_rate", "mean_return", "ic", "hit_rate_high"])
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--output", default="logs/optimize_results.csv")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--min-signals", type=int, default=MIN_SIGNALS,
+                        help="drop candidates with fewer signals than this before ranking")
+    args = parser.parse_args()
+
+    candidates = (grid_candidates(args.step) if args.mode == "grid"
+                  else random_candidates(args.samples, args.seed))
+    print(f"Evaluating {len(candidates)} candidates...")
+    results = optimize(candidates, args.horizon, args.rank_by, args.workers, start=args.start, end=args.end,
+                       min_signals=args.min_signals)
+    if not results:
+        print(f"No candidate produced {args.min_signals}+ signals over the stored history; "
+              "import more with 'python src/history.py import' or lower --min-signals.")
+        return
+
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} ranked results to {args.output}")
+    for row in results[:args.top]:
+        print(f"w=({row['price']:.2f}, {row['news']:.2f}, {row['insider']:.2f}) "
+              f"buy={row['buy']:.2f} sell={row['sell']:.2f} "
+              f"{args.rank_by}={row[args.rank_by]:.4f} hit={row['hit_rate']:.3f} signals={row['signals']}")
+
+
+if __name__ == "__main__":
+    main()
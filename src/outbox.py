@@ -0,0 +1,155 @@
+"""
+Persistent delivery outbox for Discord webhook messages.
+
+The analysis job only renders and enqueues its messages (enqueue) and then
+exits; a separate worker (drain / `python src/outbox.py`) posts them with
+retries and backoff. Each message carries an idempotency key, so re-running
+the same day's job doesn't queue duplicates, and anything already sent is
+never sent again.
+
+The webhook URL is resolved at send time rather than stored on disk.
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from delivery import WebhookClient, WebhookDeliveryError, WebhookRejectedError
+
+OUTBOX_PATH = os.getenv("DST_OUTBOX_PATH", "data/outbox.db")
+MAX_ATTEMPTS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending | sent | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    message_id TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def connect(path=OUTBOX_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def enqueue(payloads, key_prefix, path=OUTBOX_PATH):
+    """Queue webhook payloads in order; returns how many were new
+
+    The key combines the prefix, position and content hash, so re-rendering an
+    identical report is a no-op while a changed one is queued again.
+    """
+    conn = connect(path)
+    now = time.time()
+    added = 0
+    with conn:
+        for i, payload in enumerate(payloads):
+            body = json.dumps(payload, sort_keys=True)
+            key = f"{key_prefix}:{i}:{hashlib.sha1(body.encode()).hexdigest()[:16]}"
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, payload, created_at) VALUES (?, ?, ?)",
+                (key, body, now),
+            )
+            added += cursor.rowcount
+    conn.close()
+    return added
+
+
+def pending_count(path=OUTBOX_PATH):
+    conn = connect(path)
+    count = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+    conn.close()
+    return count
+
+
+async def drain_async(url, path=OUTBOX_PATH, max_seconds=300):
+    """Deliver pending messages in order until none are left or max_seconds passes
+
+    A failed message is retried with exponential backoff and holds back the
+    ones queued after it, so report parts never arrive out of order. After
+    MAX_ATTEMPTS it is marked failed and the queue moves on; a message Discord
+    rejects outright (4xx other than 429) is marked failed at once.
+    Returns the number of messages sent.
+    """
+    conn = connect(path)
+    deadline = time.monotonic() + max_seconds
+    sent = 0
+    async with WebhookClient() as client:
+        while time.monotonic() < deadline:
+            row = conn.execute(
+                "SELECT id, payload, attempts, next_attempt_at FROM outbox "
+                "WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            msg_id, payload, attempts, next_attempt_at = row
+
+            wait = next_attempt_at - time.time()
+            if wait > 0:
+                if time.monotonic() + wait > deadline:
+                    break
+                await asyncio.sleep(wait)
+
+            try:
+                message = await client.post(url, json.loads(payload))
+            except WebhookDeliveryError as e:
+                attempts += 1
+                # A rejected payload will be rejected again; don't let it hold back the queue
+                permanent = isinstance(e, WebhookRejectedError)
+                status = "failed" if permanent or attempts >= MAX_ATTEMPTS else "pending"
+                with conn:
+                    conn.execute(
+                        "UPDATE outbox SET attempts = ?, status = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                        (attempts, status, str(e)[:500], time.time() + min(30 * 2 ** attempts, 3600), msg_id),
+                    )
+                print(f"Outbox message {msg_id} failed (attempt {attempts}): {e}")
+                continue
+
+            with conn:
+                conn.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, message_id = ? WHERE id = ?",
+                    (attempts + 1, time.time(), (message or {}).get("id"), msg_id),
+                )
+            sent += 1
+    conn.close()
+    return sent
+
+
+def drain(url, path=OUTBOX_PATH, max_seconds=300):
+    return asyncio.run(drain_async(url, path, max_seconds))
+
+
+def main():
+    from config.config import DISCORD_WEBHOOK_URL
+
+    parser = argparse.ArgumentParser(description="Deliver queued Discord webhook messages")
+    parser.add_argument("--max-seconds", type=float, default=300,
+                        help="stop after this long even if messages are still waiting on backoff")
+    args = parser.parse_args()
+
+    if not DISCORD_WEBHOOK_URL:
+        print("DISCORD_WEBHOOK_URL not set; nothing to deliver to.")
+        return
+    sent = drain(DISCORD_WEBHOOK_URL, max_seconds=args.max_seconds)
+    print(f"Outbox: sent {sent} message(s), {pending_count()} still pending")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Deterministic profiling of a pipeline run.
+
+    python src/main.py --profile
+    $profile TICKER              (bot owner only)
+
+profile_call runs a function under cProfile and writes
+logs/profiles/<name>_<timestamp>.prof (open it with `python -m pstats` or
+snakeviz) plus a .txt summary next to it:
+
+* wall-clock time against the process's CPU time;
+* own time by area (network, waiting on locks/queues/sleeps, SQLite, JSON,
+  feedparser, embed formatting, everything else), so it's clear what grows
+  with the universe;
+* the top functions by cumulative time, and the top CPU functions by own
+  time with blocking calls left out.
+
+Worker threads started while the profile runs (the stage pool, hedged
+requests) get their own profiler and are merged into the same file; times
+summed across threads can exceed the wall-clock time.
+"""
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_DIR = os.getenv("DST_PROFILE_DIR", "logs/profiles")
+TOP_FUNCTIONS = 20
+
+# Matched against "<file>:<function>" of each profiled function, first match wins
+AREAS = [
+    ("network", re.compile(r"_socket|_ssl\.|select\.|getaddrinfo")),
+    ("waiting", re.compile(r"_thread\.(lock|RLock)|_queue\.|time\.sleep")),
+    ("sqlite", re.compile(r"sqlite3")),
+    ("json", re.compile(r"[/\\]json[/\\]|[ ']_json\.")),
+    ("feedparser", re.compile(r"feedparser|pyexpat|xml[/\\]sax")),
+    ("formatting", re.compile(r"discord[/\\]embeds|(discord_bot|send_report)\.py:\d+\(format_")),
+]
+BLOCKING = {"network", "waiting"}
+
+
+def area(func):
+    filename, line, name = func
+    label = f"{filename}:{line}({name})"
+    for area_name, pattern in AREAS:
+        if pattern.search(label):
+            return area_name
+    return "other"
+
+
+def _top(stats, key, limit, skip=()):
+    rows = sorted(((f, s) for f, s in stats.stats.items() if area(f) not in skip),
+                  key=lambda item: item[1][key], reverse=True)
+    return [
+        f"  {s[3]:9.3f}s cum {s[2]:9.3f}s own {s[1]:>8} calls  {pstats.func_std_string(f)}"
+        for f, s in rows[:limit]
+    ]
+
+
+def summarize(stats, name, wall, cpu, limit=TOP_FUNCTIONS):
+    """Text summary of merged pstats.Stats for a run that took `wall` seconds and `cpu` CPU seconds"""
+    by_area = {}
+    for func, (_, _, own, _, _) in stats.stats.items():
+        by_area[area(func)] = by_area.get(area(func), 0.0) + own
+    blocked = sum(t for a, t in by_area.items() if a in BLOCKING)
+
+    lines = [
+        f"Profile {name}: wall {wall:.2f}s, process CPU {cpu:.2f}s ({cpu / wall:.0%} of wall)" if wall else
+        f"Profile {name}: process CPU {cpu:.2f}s",
+        f"Blocked on network or waiting: {blocked:.2f}s (summed over threads)",
+        "Own time by area: " + ", ".join(f"{a} {t:.2f}s" for a, t in sorted(by_area.items(), key=lambda kv: -kv[1])),
+        "",
+        "Top functions by cumulative time:",
+        *_top(stats, 3, limit),
+        "",
+        "Top CPU functions by own time (blocking calls excluded):",
+        *_top(stats, 2, limit, skip=BLOCKING),
+    ]
+    return "\n".join(lines)
+
+
+def profile_call(fn, *args, name="run", threads=True, profile_dir=PROFILE_DIR, **kwargs):
+    """Run fn(*args, **kwargs) under cProfile; returns (result, profile path, summary)
+
+    With threads=False only the calling thread is profiled. Worker profilers
+    can only be stopped from their own thread, so leave it off in long-lived
+    processes. The profile is written even if fn raises; the exception then
+    propagates.
+    """
+    profilers = []
+
+    def start_thread_profiler(frame, event, arg):
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Python 3.12+ profiles every thread from the first profiler already
+        profilers.append(profiler)
+
+    main_profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if threads:
+        threading.setprofile(start_thread_profiler)
+    main_profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        main_profiler.disable()
+        threading.setprofile(None)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+        stats = pstats.Stats(main_profiler)
+        for profiler in profilers:
+            stats.add(profiler)
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        path = Path(profile_dir) / f"{name}_{datetime.now():%Y-%m-%d_%H%M%S}.prof"
+        stats.dump_stats(path)
+        summary = summarize(stats, name, wall, cpu)
+        path.with_suffix(".txt").write_text(summary + "\n")
+        print(summary)
+        print(f"Profile written to {path}")
+    return result, path, summary
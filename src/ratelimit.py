@@ -0,0 +1,57 @@
+"""
+Token buckets for rate limiting.
+
+Used by the bot's work queue for per-user, per-guild and bot-wide limits,
+and by the cache pre-warm to stay under each provider's quota.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`
+
+    Thread-safe, so the same bucket can be shared by the event loop and
+    worker threads.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` could be taken (0 if available now)"""
+        with self._lock:
+            self._refill()
+            missing = tokens - self.tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate if self.rate > 0 else float("inf")
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available; returns False without waiting otherwise"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def is_full(self):
+        """True once the bucket has refilled completely, i.e. it is no different from a new one"""
+        with self._lock:
+            self._refill()
+            return self.tokens >= self.capacity
+
+    def acquire(self, tokens=1):
+        """Block the calling thread until `tokens` can be taken"""
+        while not self.try_acquire(tokens):
+            time.sleep(max(self.wait_time(tokens), 0.01))
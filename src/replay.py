@@ -0,0 +1,259 @@
+"""
+Record / replay of provider responses.
+
+    python src/main.py --record [data/replay/dst_<date>.jsonl.gz]
+    python src/main.py --replay data/replay/dst_<date>.jsonl.gz
+    python src/replay.py show data/replay/dst_<date>.jsonl.gz
+
+Recording hooks the two transports every provider call goes through:
+requests' Session.send (Alpha Vantage, news RSS, sec-api.io) and the httpx
+client behind the OpenAI SDK. It appends each response to a gzip JSONL
+archive. Replay serves those responses back in the order they were recorded
+and never touches the network; a request that wasn't recorded fails like a
+connection error. A replayed run doesn't write the price history or the
+stage fingerprints either, so it can't disturb the next real run.
+
+Requests are matched on method, URL and a hash of the body. Credentials
+never reach the archive: request headers aren't stored, and secret query
+parameters (apikey, token, ...) are blanked before the URL is keyed.
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FORMAT = "dst-replay/1"
+REPLAY_DIR = "data/replay"
+SECRET_PARAMS = re.compile(r"key|token|secret|password|signature", re.I)
+# Bodies are stored decoded, so encoding/length headers would no longer be true
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection",
+                "set-cookie", "openai-organization", "openai-project"}
+
+_lock = threading.Lock()
+_session = None  # the active Recorder or Player
+_originals = {}
+
+
+class ReplayMissError(requests.ConnectionError):
+    """A request with no recorded response left to serve"""
+
+
+def default_path(date=None):
+    return f"{REPLAY_DIR}/dst_{date or datetime.now():%Y-%m-%d}.jsonl.gz"
+
+
+def redact_url(url):
+    parts = urlsplit(str(url))
+    query = [(k, "REDACTED" if SECRET_PARAMS.search(k) else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+
+def request_key(method, url, body):
+    """Identity of a request for matching: method, redacted URL and body hash"""
+    if isinstance(body, str):
+        body = body.encode()
+    body = body or b""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True).encode()  # key order must not matter
+    except ValueError:
+        pass
+    return f"{method.upper()} {redact_url(url)} {hashlib.sha1(body).hexdigest()[:16]}"
+
+
+def encode_body(content):
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode()}
+
+
+def decode_body(entry):
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.count = 0
+        self.write({"format": FORMAT, "recorded": datetime.now().isoformat(timespec="seconds"), "argv": sys.argv[1:]})
+
+    def write(self, record):
+        with _lock:
+            self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.count += "key" in record
+
+    def add(self, method, url, body, status, headers, content, elapsed):
+        self.write({
+            "key": request_key(method, url, body),
+            "url": redact_url(url),
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS},
+            "elapsed": round(elapsed, 4),
+            **encode_body(content),
+        })
+
+    def close(self):
+        with _lock:
+            self.file.close()
+        print(f"Recorded {self.count} provider response(s) to {self.path}")
+
+
+class Player:
+    def __init__(self, path):
+        self.path = path
+        self.responses = defaultdict(list)
+        self.served = Counter()
+        self.misses = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT:
+                raise ValueError(f"{path} is not a replay archive")
+            for line in f:
+                entry = json.loads(line)
+                self.responses[entry["key"]].append(entry)
+        print(f"Replaying {sum(map(len, self.responses.values()))} response(s) recorded {header['recorded']}")
+
+    def take(self, method, url, body):
+        """The next recorded response for this request; the last one repeats once they run out"""
+        key = request_key(method, url, body)
+        with _lock:
+            entries = self.responses.get(key)
+            if not entries:
+                self.misses += 1
+                raise ReplayMissError(f"No recorded response for {method} {redact_url(url)}")
+            entry = entries[min(self.served[key], len(entries) - 1)]
+            self.served[key] += 1
+        return entry
+
+    def close(self):
+        note = f"; {self.misses} request(s) had no recording" if self.misses else ""
+        print(f"Replayed {sum(self.served.values())} response(s) from {self.path}{note}")
+
+
+def _requests_send(self, request, **kwargs):
+    session = _session
+    if isinstance(session, Player):
+        entry = session.take(request.method, request.url, request.body)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = decode_body(entry)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+    started = time.monotonic()
+    response = _originals["requests"](self, request, **kwargs)
+    if isinstance(session, Recorder):
+        session.add(request.method, request.url, request.body, response.status_code,
+                    response.headers, response.content, time.monotonic() - started)
+    return response
+
+
+def _httpx_send(module):
+    original = _originals[module.__name__]
+
+    def send(self, request, **kwargs):
+        session = _session
+        if isinstance(session, Player):
+            try:
+                entry = session.take(request.method, request.url, request.content)
+            except ReplayMissError as e:
+                raise module.ConnectError(str(e), request=request) from e
+            return module.Response(entry["status"], headers=entry["headers"], content=decode_body(entry), request=request)
+        started = time.monotonic()
+        response = original(self, request, **kwargs)
+        if isinstance(session, Recorder):
+            response.read()
+            session.add(request.method, request.url, request.content, response.status_code,
+                        response.headers, response.content, time.monotonic() - started)
+        return response
+    return send
+
+
+def _install():
+    if _originals:
+        return
+    _originals["requests"] = requests.Session.send
+    requests.Session.send = _requests_send
+    # The OpenAI SDK sends through httpx (httpx2 in its newest releases)
+    for name in ("httpx", "httpx2"):
+        try:
+            module = __import__(name)
+        except ImportError:
+            continue
+        _originals[name] = module.Client.send
+        module.Client.send = _httpx_send(module)
+
+
+def record(path=None):
+    """Start capturing every provider response of this process to `path`"""
+    global _session
+    _install()
+    _session = Recorder(path or default_path())
+    return _session
+
+
+def replay(path):
+    """Serve provider responses from `path` instead of the network"""
+    global _session
+    _install()
+    _session = Player(path)
+    return _session
+
+
+def replaying():
+    """True while responses are served from an archive; such a run must leave the local stores alone"""
+    return isinstance(_session, Player)
+
+
+def stop():
+    """Finish recording or replaying; the transports go back to the network"""
+    global _session
+    session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect recorded provider responses")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="summarize a replay archive")
+    show.add_argument("path")
+    args = parser.parse_args()
+
+    with gzip.open(args.path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        entries = [json.loads(line) for line in f]
+    print(f"{args.path}: recorded {header.get('recorded')} ({' '.join(header.get('argv') or []) or 'no arguments'})")
+    hosts = defaultdict(lambda: [0, 0, Counter()])
+    for entry in entries:
+        host = hosts[urlsplit(entry["url"]).netloc]
+        host[0] += 1
+        host[1] += len(decode_body(entry))
+        host[2][entry["status"]] += 1
+    for host, (count, size, statuses) in sorted(hosts.items()):
+        codes = ", ".join(f"{status}×{n}" for status, n in sorted(statuses.items()))
+        print(f"  {host:<28} {count:>6} response(s) {size / 1024:>9.1f} KiB  {codes}")
+
+
+if __name__ == "__main__":
+    main()
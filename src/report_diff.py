@@ -0,0 +1,56 @@
+"""
+Compare a report with the previous saved one, ticker by ticker.
+
+A ticker counts as changed when its signal/confidence, score (beyond
+SCORE_TOLERANCE), news or insider summary, notable insider trades or set of
+timed-out stages differ; day-to-day price noise alone doesn't make it changed.
+"""
+
+SCORE_TOLERANCE = 0.05
+
+
+def _summary(analysis):
+    return (analysis or {}).get("summary")
+
+
+def changed_fields(previous, current):
+    """Names of the fields that differ between two signal entries"""
+    fields = []
+    if (previous.get("signal"), previous.get("confidence")) != (current.get("signal"), current.get("confidence")):
+        fields.append("signal")
+    if abs((previous.get("score") or 0) - (current.get("score") or 0)) > SCORE_TOLERANCE:
+        fields.append("score")
+    if _summary(previous.get("news_analysis")) != _summary(current.get("news_analysis")):
+        fields.append("news")
+    if _summary(previous.get("insider_analysis")) != _summary(current.get("insider_analysis")):
+        fields.append("insider summary")
+    if ((previous.get("insider_data") or {}).get("notable") !=
+            (current.get("insider_data") or {}).get("notable")):
+        fields.append("insider trades")
+    if (previous.get("missing") or []) != (current.get("missing") or []):
+        fields.append("completeness")
+    return fields
+
+
+def diff_reports(previous, current):
+    """Classify every ticker of `current` as new, changed or unchanged relative to `previous`
+
+    Returns {"new": [ticker], "changed": {ticker: [field]}, "unchanged": [ticker],
+    "removed": [ticker]}, each in report order.
+    """
+    before = {s["ticker"]: s for s in (previous or {}).get("signals", [])}
+    diff = {"new": [], "changed": {}, "unchanged": [], "removed": []}
+    seen = set()
+    for s in current.get("signals", []):
+        ticker = s["ticker"]
+        seen.add(ticker)
+        if ticker not in before:
+            diff["new"].append(ticker)
+            continue
+        fields = changed_fields(before[ticker], s)
+        if fields:
+            diff["changed"][ticker] = fields
+        else:
+            diff["unchanged"].append(ticker)
+    diff["removed"] = [t for t in before if t not in seen]
+    return diff
@@ -0,0 +1,200 @@
+"""
+Per-provider health tracking: circuit breakers, latency stats and hedged GETs.
+
+Every outbound call to Alpha Vantage, sec-api.io, the news feeds or OpenAI
+goes through call_provider / provider_get with a provider name:
+
+* after BREAKER_FAILURES consecutive failures (errors, 5xx/429, or responses
+  the caller flags, such as Alpha Vantage quota notes) the provider's breaker
+  opens and calls fail immediately with CircuitOpenError instead of waiting
+  out a timeout. After BREAKER_RESET_SECONDS one probe call is let through;
+  success closes the breaker, failure re-opens it;
+* with DST_HEDGED_REQUESTS=1, idempotent GETs fire a second attempt when the
+  first hasn't answered within the provider's recent p95 latency, and use
+  whichever finishes first.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from tracing import span
+
+BREAKER_FAILURES = int(os.getenv("DST_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("DST_BREAKER_RESET_SECONDS", "60"))
+HEDGED_REQUESTS = os.getenv("DST_HEDGED_REQUESTS", "0") == "1"
+HEDGE_MIN_SAMPLES = 20   # latencies needed before the p95 is trusted
+LATENCY_WINDOW = 200
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} circuit open; retrying in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ProviderHealth:
+    """Circuit breaker plus a rolling latency window for one provider (thread-safe)"""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.max_failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now; returns True if that call is the probe
+
+        Pass the returned flag on to record() with the call's outcome.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            waited = time.monotonic() - self.opened_at
+            if self.state == OPEN and waited >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True  # exactly one probe at a time
+                return True
+            raise CircuitOpenError(self.name, max(self.reset_seconds - waited, 0))
+
+    def record(self, ok, latency=None, probe=False):
+        with self._lock:
+            if probe:
+                # Only the probe's own result frees the slot; a call that went out
+                # before the circuit opened must not let a second probe through
+                self._probing = False
+            if latency is not None:
+                self.latencies.append(latency)
+            if ok:
+                if self.state != CLOSED:
+                    print(f"[{self.name}] recovered; closing circuit")
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.max_failures:
+                if self.state != OPEN:
+                    print(f"[{self.name}] {self.failures} failure(s); opening circuit for {self.reset_seconds:.0f}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "samples": len(self.latencies),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+        }
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def provider(name):
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = ProviderHealth(name)
+        return _providers[name]
+
+
+def provider_health():
+    """{provider: state, failure count and latency percentiles} for status displays"""
+    with _providers_lock:
+        names = sorted(_providers)
+    return {name: provider(name).snapshot() for name in names}
+
+
+def http_failed(response):
+    """Server-side trouble worth tripping a breaker over (not 4xx caller errors)"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def response_tags(result):
+    """Trace tags for an HTTP response or an OpenAI completion"""
+    tags = {}
+    if hasattr(result, "status_code"):
+        tags["http_status"] = result.status_code
+        tags["bytes"] = len(result.content or b"")
+    usage = getattr(result, "usage", None)
+    if usage is not None:
+        tags["tokens"] = getattr(usage, "total_tokens", None)
+    return tags
+
+
+def call_provider(name, fn, *args, is_failure=None, **kwargs):
+    """fn(*args, **kwargs) behind the provider's circuit breaker, traced as a "provider" span
+
+    Exceptions count as failures, as do results for which is_failure(result)
+    is true (the result is still returned to the caller).
+    """
+    health = provider(name)
+    with span("provider", provider=name) as s:
+        try:
+            probe = health.before_call()
+        except CircuitOpenError:
+            s.tag(circuit=OPEN)
+            raise
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            health.record(False, probe=probe)
+            raise
+        ok = not (is_failure and is_failure(result))
+        health.record(ok, time.monotonic() - started, probe=probe)
+        s.tag(**response_tags(result))
+        if not ok:
+            s.status = "failed"
+    return result
+
+
+def _hedged(send, delay):
+    """Run send(); if it hasn't finished after `delay` seconds, race a second copy"""
+    first = _hedge_pool.submit(send)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    second = _hedge_pool.submit(send)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def provider_get(name, url, is_failure=http_failed, hedge=True, **kwargs):
+    """requests.get behind the provider's breaker, hedged when enabled and the p95 is known"""
+    health = provider(name)
+    send = lambda: requests.get(url, **kwargs)
+    delay = health.percentile(0.95) if HEDGED_REQUESTS and hedge else None
+    if delay is not None and len(health.latencies) >= HEDGE_MIN_SAMPLES:
+        return call_provider(name, _hedged, send, max(delay, 0.05), is_failure=is_failure)
+    return call_provider(name, send, is_failure=is_failure)
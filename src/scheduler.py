@@ -1,12 +1,228 @@
 """
-DST Trading Agent — Local Scheduler Stub
+DST Trading Agent — Self-hosted Scheduler
 
-Scheduling is handled by GitHub Actions (see .github/workflows/daily-report.yml).
-This module remains as a placeholder for future self-hosted scheduling.
+A long-running alternative to the GitHub Actions workflow (docker-compose runs
+it as the trading-agent service). Times follow the NYSE calendar in
+DST_MARKET_TZ, and nothing runs on weekends or exchange holidays:
 
-To run the analysis locally once:
-    python -m src.main
+* the full daily run (src/main.py, then an outbox drain and log compaction)
+  at DST_DAILY_RUN_TIME, preceded by a rate-limited cache pre-warm
+  (cache.py) spread over the DST_PREWARM_MINUTES before it;
+* every DST_TRIGGER_MINUTES on trading days, a poll of the cheap change
+  sources in triggers.py: new insider filings, new headlines and, while the
+  market is open, price moves. Only the tickers whose inputs changed are
+  re-scored, and only their changed stages re-run. Updated entries are
+  written back to today's log and only the changed tickers are queued for
+  delivery.
+
+    python src/scheduler.py                   # run forever
+    python src/scheduler.py --once daily      # or: --once refresh (one poll, prices included)
 """
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import copy
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+import pytz
+import schedule
+
+from dst_agent import load_tickers, merge_signals, save_log
+from cache import PREWARM_MINUTES
+from report_diff import diff_reports
+from send_report import queue_report
+from watchlists import subset_report
+
+MARKET_TZ = pytz.timezone(os.getenv("DST_MARKET_TZ", "America/New_York"))
+DAILY_RUN_TIME = os.getenv("DST_DAILY_RUN_TIME", "08:00")
+DRAIN_SECONDS = 600
+
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+
+# --- NYSE calendar -------------------------------------------------------
+
+def easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=-1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Saturday holidays close the Friday before, Sunday ones the Monday after"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(year):
+    """Full-day NYSE closures for a year (early closes trade normally here)"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),    # Washington's Birthday
+        easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),   # Memorial Day
+        _observed(date(year, 7, 4)),    # Independence Day
+        _nth_weekday(year, 9, 0, 1),    # Labor Day
+        _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day on a Saturday isn't made up on the Friday before
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+
+def market_now():
+    return datetime.now(MARKET_TZ)
+
+
+def is_market_open(now=None):
+    now = now or market_now()
+    return is_trading_day(now.date()) and MARKET_OPEN <= (now.hour, now.minute) < MARKET_CLOSE
+
+
+# --- Jobs ----------------------------------------------------------------
+
+def daily_job():
+    if not is_trading_day(market_now().date()):
+        print(f"{market_now():%Y-%m-%d} is not a trading day; skipping the daily run")
+        return
+    run_daily()
+
+
+def run_daily():
+    """Full analysis, then delivery and log compaction"""
+    print(f"Starting daily run at {market_now():%Y-%m-%d %H:%M %Z}")
+    # A separate process, so a crash in one run can't take the scheduler down
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), "main.py")])
+    if result.returncode != 0:
+        print(f"Daily run exited with status {result.returncode}")
+    drain_outbox()
+
+    from log_archive import compact
+    try:
+        compact(delete=True)
+    except Exception as e:
+        print(f"Error compacting logs: {e}")
+
+
+def prewarm_job():
+    """Start filling the provider cache for the coming daily run, in the background"""
+    if not is_trading_day(market_now().date()):
+        return
+    print(f"Starting cache pre-warm ({PREWARM_MINUTES} min window)")
+    # Detached, so the poll job keeps running while it paces itself
+    subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "cache.py"),
+                      "prewarm", "--window-minutes", str(PREWARM_MINUTES)])
+
+
+def minutes_before(hhmm, minutes):
+    """'HH:MM' the given number of minutes earlier, wrapping past midnight"""
+    hour, minute = map(int, hhmm.split(":"))
+    total = (hour * 60 + minute - minutes) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def drain_outbox():
+    from config.config import DISCORD_WEBHOOK_URL
+    from outbox import drain, pending_count
+
+    if not DISCORD_WEBHOOK_URL:
+        return
+    try:
+        sent = drain(DISCORD_WEBHOOK_URL, max_seconds=DRAIN_SECONDS)
+        print(f"Outbox: sent {sent} message(s), {pending_count()} still pending")
+    except Exception as e:
+        print(f"Error draining outbox: {e}")
+
+
+def publish_update(report, entries, webhook=True, drain=True):
+    """Write re-scored entries into today's log and queue the changed tickers for delivery
+
+    The bot notices the rewritten log and alerts $watch channels itself.
+    """
+    previous = copy.deepcopy(report)
+    merge_signals(report, entries)
+    report["updated"] = f"{market_now():%H:%M %Z}"
+    save_log(report)
+    if not webhook:
+        return
+
+    base_tickers = load_tickers()
+    current, before = subset_report(report, base_tickers), subset_report(previous, base_tickers)
+    diff = diff_reports(before, current)
+    if diff["changed"] or diff["new"]:
+        queue_report(current, before)
+        if drain:
+            drain_outbox()
+
+
+def poll_job():
+    from triggers import poll_once
+    if is_trading_day(market_now().date()):
+        try:
+            poll_once(webhook=True)
+        except Exception as e:
+            print(f"Error polling for changes: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-hosted DST scheduler")
+    parser.add_argument("--once", choices=("daily", "refresh"),
+                        help="run a single job now and exit (ignores the market calendar)")
+    args = parser.parse_args()
+
+    if args.once == "daily":
+        run_daily()
+        return
+    if args.once == "refresh":
+        from triggers import poll_once
+        poll_once(webhook=True, check_prices_now=True)
+        return
+
+    if PREWARM_MINUTES:
+        schedule.every().day.at(minutes_before(DAILY_RUN_TIME, PREWARM_MINUTES), MARKET_TZ.zone).do(prewarm_job)
+    schedule.every().day.at(DAILY_RUN_TIME, MARKET_TZ.zone).do(daily_job)
+    from triggers import POLL_MINUTES, PRICE_MINUTES
+    if POLL_MINUTES:
+        schedule.every(POLL_MINUTES).minutes.do(poll_job)
+    print(f"Scheduler started: daily run at {DAILY_RUN_TIME} {MARKET_TZ.zone} on NYSE trading days, "
+          f"change polls every {POLL_MINUTES} min (prices every {PRICE_MINUTES} min while the market is open)")
+    while True:
+        schedule.run_pending()
+        time.sleep(30)
+
 
 if __name__ == "__main__":
-    print("Scheduling is managed by GitHub Actions. Run 'python src/main.py' locally to execute once.")
+    main()
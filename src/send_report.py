@@ -1,120 +1,128 @@
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import requests
 from config.config import DISCORD_WEBHOOK_URL
+from delivery import pack_embeds
+import outbox
+from report_diff import diff_reports
 
-def send_to_discord(report):
-    try:
-        if not DISCORD_WEBHOOK_URL:
-            print("DISCORD_WEBHOOK_URL not set; skipping Discord delivery.")
-            return
-        lines = [f"📊 **DST Report — {report['date']}**"]
+SIGNAL_COLORS = {"Buy": 0x00ff00, "Sell": 0xff0000, "Hold": 0xffff00}
 
-        lines.append(f"\n🟢 **Buy ({len(report['buy'])})**: {', '.join(report['buy']) or 'None'}")
-        lines.append(f"🔴 **Sell ({len(report['sell'])})**: {', '.join(report['sell']) or 'None'}")
-        lines.append(f"🟡 **Hold ({len(report['hold'])})**: {', '.join(report['hold']) or 'None'}")
+def truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
 
-        # Add AI Insights Summary
-        ai_insights = []
-        for s in report["signals"]:
-            if s.get("signal") in ["Buy", "Sell"] and s.get("confidence") == "High":
-                news_analysis = s.get("news_analysis", {})
-                if news_analysis and news_analysis.get("summary"):
-                    ai_insights.append(f"**{s['ticker']}**: {news_analysis['summary'][:100]}...")
-        
-        if ai_insights:
-            lines.append("\n🤖 **Key AI Insights:**")
-            for insight in ai_insights[:3]:  # Limit to top 3
-                lines.append(f"• {insight}")
-
-        lines.append("\n---\n**Detailed Analysis:**")
+def build_header_embed(report):
+    """Overview embed: buy/sell/hold lists and the key AI insights"""
+    fields = [
+        {"name": f"🟢 Buy ({len(report['buy'])})", "value": truncate(', '.join(report['buy']) or 'None', 1024), "inline": True},
+        {"name": f"🔴 Sell ({len(report['sell'])})", "value": truncate(', '.join(report['sell']) or 'None', 1024), "inline": True},
+        {"name": f"🟡 Hold ({len(report['hold'])})", "value": truncate(', '.join(report['hold']) or 'None', 1024), "inline": True},
+    ]
 
-        for s in report["signals"]:
-            fundamentals = s.get("fundamentals", {})
-            fundamentals_str = ", ".join(
-                f"{k}: {v}" for k, v in fundamentals.items() if v
-            )
-
-            lines.append(f"\n🔹 **{s['ticker']}** — {s['signal']} ({s['confidence']})")
-            lines.append(f"• Score: {s['score']} | Δ Price: {s['price_change_pct']}%")
-            
-            if fundamentals_str:
-                lines.append(f"• Fundamentals: {fundamentals_str}")
-                
-            # Add ChatGPT News Analysis
+    # Add AI Insights Summary
+    ai_insights = []
+    for s in report["signals"]:
+        if s.get("signal") in ["Buy", "Sell"] and s.get("confidence") == "High":
             news_analysis = s.get("news_analysis", {})
             if news_analysis and news_analysis.get("summary"):
-                lines.append(f"• 🤖 **News AI**: {news_analysis['summary']} (Score: {news_analysis.get('sentiment_score', 0)})")
-            
-            # Add ChatGPT Insider Analysis  
-            insider_analysis = s.get("insider_analysis", {})
-            if insider_analysis and insider_analysis.get("summary") and "No significant" not in insider_analysis.get("summary", ""):
-                lines.append(f"• 🕵️ **Insider AI**: {insider_analysis['summary']} (Score: {insider_analysis.get('sentiment_score', 0)})")
-
-        if report.get("insider_activity"):
-            lines.append("\n---\n**Notable Insider/Senator Trades:**")
-            for line in report["insider_activity"]:
-                lines.append(f"🔍 {line}")
-
-        # Join content and split into multiple messages if needed
-        full_content = "\n".join(lines)
-        
-        def split_message(content, max_length=1950):
-            """Split content into chunks that fit Discord's limit"""
-            if len(content) <= max_length:
-                return [content]
-            
-            chunks = []
-            current_chunk = ""
-            
-            for line in content.split('\n'):
-                # If adding this line would exceed the limit
-                if len(current_chunk) + len(line) + 1 > max_length:
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                        current_chunk = line
-                    else:
-                        # Single line is too long, force split
-                        chunks.append(line[:max_length])
-                        current_chunk = line[max_length:]
-                else:
-                    if current_chunk:
-                        current_chunk += "\n" + line
-                    else:
-                        current_chunk = line
-            
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            return chunks
-        
-        message_chunks = split_message(full_content)
-        
-        # Send each chunk as a separate message
-        for i, chunk in enumerate(message_chunks):
-            if len(message_chunks) > 1:
-                # Add part indicator for multi-part messages
-                header = f"**[Part {i+1}/{len(message_chunks)}]**\n\n" if i > 0 else ""
-                content_to_send = header + chunk
-            else:
-                content_to_send = chunk
-            
-            response = requests.post(
-                DISCORD_WEBHOOK_URL,
-                json={"content": content_to_send},
-                timeout=10
-            )
-            
-            if response.status_code in [200, 204]:
-                if len(message_chunks) > 1:
-                    print(f"Report part {i+1}/{len(message_chunks)} sent to Discord successfully")
-                else:
-                    print("Report sent to Discord successfully")
-            else:
-                print(f"Failed to send report part {i+1}: {response.status_code}")
-                print(f"Response: {response.text}")
-                break  # Stop sending if one fails
-
-    except Exception as e:
-        print(f"Error sending report to Discord: {e}")
+                ai_insights.append(f"**{s['ticker']}**: {news_analysis['summary'][:100]}...")
+
+    if ai_insights:
+        fields.append({
+            "name": "🤖 Key AI Insights",
+            "value": truncate("\n".join(f"• {insight}" for insight in ai_insights[:3]), 1024),  # Limit to top 3
+            "inline": False,
+        })
+
+    title = f"📊 DST Report — {report['date']}"
+    if report.get("updated"):
+        title += f" (updated {report['updated']})"
+    return {"title": title, "color": 0x3498db, "fields": fields}
+
+def build_ticker_embed(s, note=None):
+    """Detailed section for one ticker, optionally annotated with what changed"""
+    fundamentals = s.get("fundamentals", {})
+    fundamentals_str = ", ".join(
+        f"{k}: {v}" for k, v in fundamentals.items() if v
+    )
+
+    lines = [note] if note else []
+    if s.get("missing"):
+        lines.append(f"⚠️ Incomplete — timed out: {', '.join(s['missing'])} (scored as neutral)")
+    lines.append(f"• Score: {s['score']} | Δ Price: {s['price_change_pct']}%")
+
+    if fundamentals_str:
+        lines.append(f"• Fundamentals: {fundamentals_str}")
+
+    # Add ChatGPT News Analysis
+    news_analysis = s.get("news_analysis", {})
+    if news_analysis and news_analysis.get("summary"):
+        lines.append(f"• 🤖 **News AI**: {news_analysis['summary']} (Score: {news_analysis.get('sentiment_score', 0)})")
+
+    # Add ChatGPT Insider Analysis
+    insider_analysis = s.get("insider_analysis", {})
+    if insider_analysis and insider_analysis.get("summary") and "No significant" not in insider_analysis.get("summary", ""):
+        lines.append(f"• 🕵️ **Insider AI**: {insider_analysis['summary']} (Score: {insider_analysis.get('sentiment_score', 0)})")
+
+    return {
+        "title": f"🔹 {s['ticker']} — {s['signal']} ({s['confidence']})",
+        "color": SIGNAL_COLORS.get(s["signal"], 0x95a5a6),
+        "description": truncate("\n".join(lines), 4096),
+    }
+
+def build_insider_embed(report):
+    lines = [f"🔍 {line}" for line in report.get("insider_activity", [])]
+    return {
+        "title": "Notable Insider/Senator Trades",
+        "color": 0x9b59b6,
+        "description": truncate("\n".join(lines), 4096),
+    }
+
+def build_unchanged_embed(signals, previous_date):
+    """One compact line per ticker whose analysis matches the previous report"""
+    lines = [f"{s['ticker']} — {s['signal']} ({s['confidence']}) | Score: {s['score']}" for s in signals]
+    return {
+        "title": f"➖ Unchanged since {previous_date} ({len(signals)})",
+        "color": 0x95a5a6,
+        "description": truncate("\n".join(lines), 4096),
+    }
+
+def build_report_embeds(report, previous=None):
+    """Render the report as one embed per section, in display order
+
+    With a previous report, only new and changed tickers get a detailed
+    section; unchanged ones are folded into a single compact embed.
+    """
+    embeds = [build_header_embed(report)]
+    if previous is None:
+        embeds.extend(build_ticker_embed(s) for s in report["signals"])
+    else:
+        diff = diff_reports(previous, report)
+        unchanged = set(diff["unchanged"])
+        for s in report["signals"]:
+            if s["ticker"] in diff["changed"]:
+                embeds.append(build_ticker_embed(s, f"✏️ Changed: {', '.join(diff['changed'][s['ticker']])}"))
+            elif s["ticker"] not in unchanged:
+                embeds.append(build_ticker_embed(s, "🆕 New"))
+        if unchanged:
+            embeds.append(build_unchanged_embed(
+                [s for s in report["signals"] if s["ticker"] in unchanged], previous.get("date")))
+    if report.get("insider_activity"):
+        embeds.append(build_insider_embed(report))
+    return embeds
+
+def build_report_messages(report, previous=None):
+    """Webhook payloads for the report, packing up to 10 embeds per message"""
+    return pack_embeds(build_report_embeds(report, previous))
+
+def queue_report(report, previous=None):
+    """Render the report into the delivery outbox; the outbox worker sends it
+
+    Pass the previous report to send only what changed since then in detail.
+    """
+    if not DISCORD_WEBHOOK_URL:
+        print("DISCORD_WEBHOOK_URL not set; skipping Discord delivery.")
+        return 0
+    added = outbox.enqueue(build_report_messages(report, previous), f"report:{report['date']}")
+    print(f"Queued {added} report message(s) for delivery")
+    return added
@@ -0,0 +1,252 @@
+"""
+Lightweight run tracing: timed spans, a per-run JSON trace and a Prometheus textfile.
+
+    start_trace("daily")
+    with span("stage", ticker="MSFT", stage="news") as s:
+        ...
+        s.tag(cache="hit")
+    finish_trace(tickers=10)
+
+Spans nest per thread; work handed to a pool keeps its parent when wrapped
+with traced(fn). Outside an active trace span() is a no-op, so long-running
+processes like the bot don't accumulate anything.
+
+finish_trace writes logs/traces/<run>_<timestamp>.json (every span plus a
+summary) and, for node_exporter's textfile collector, DST_METRICS_TEXTFILE
+with per-provider and per-stage p50/p95 latency, error and cache counters and
+run totals.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+TRACE_DIR = os.getenv("DST_TRACE_DIR", "logs/traces")
+METRICS_TEXTFILE = os.getenv("DST_METRICS_TEXTFILE", "data/metrics/dst.prom")
+
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_trace = None  # {"run", "started", "t0", "spans"} while a trace is active
+
+
+class Span:
+    def __init__(self, kind, tags, parent):
+        self.id = next(_ids)
+        self.kind = kind
+        self.tags = tags
+        self.parent = parent.id if parent else None
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status = "ok"
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def as_dict(self, t0):
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "kind": self.kind,
+            "start": round(self.start - t0, 6),
+            "duration": round(self.duration, 6),
+            "status": self.status,
+            "thread": self.thread,
+            **self.tags,
+        }
+
+
+class _NoSpan:
+    def tag(self, **tags):
+        pass
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current():
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(kind, **tags):
+    """Time the enclosed block as a span of `kind`; exceptions mark it status="error" """
+    if _trace is None:
+        yield _NoSpan()
+        return
+    s = Span(kind, tags, current())
+    s.thread = threading.current_thread().name
+    stack = _stack()
+    stack.append(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.tags.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        stack.pop()
+        with _lock:
+            if _trace is not None:
+                _trace["spans"].append(s)
+
+
+def traced(fn):
+    """Wrap fn so that, run on another thread, its spans nest under the caller's current span"""
+    parent = current()
+
+    def run(*args, **kwargs):
+        stack = _stack()
+        if parent is not None:
+            stack.append(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if parent is not None:
+                stack.pop()
+    return run
+
+
+def start_trace(run):
+    global _trace
+    with _lock:
+        _trace = {"run": run, "started": datetime.now(), "t0": time.perf_counter(), "spans": []}
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def summarize(spans):
+    """Latency percentiles and counts per provider, per stage and per cache namespace"""
+    groups = {"provider": {}, "stage": {}, "cache": {}}
+    for s in spans:
+        if s["kind"] == "provider":
+            groups["provider"].setdefault(s.get("provider"), []).append(s)
+        elif s["kind"] == "stage":
+            groups["stage"].setdefault(s.get("stage"), []).append(s)
+        elif s["kind"] == "cache":
+            groups["cache"].setdefault(s.get("namespace"), []).append(s)
+
+    summary = {}
+    for kind, by_name in groups.items():
+        summary[kind] = {}
+        for name, items in sorted(by_name.items(), key=lambda kv: str(kv[0])):
+            durations = [s["duration"] for s in items]
+            summary[kind][name] = {
+                "count": len(items),
+                "errors": sum(1 for s in items if s["status"] != "ok"),
+                "total": round(sum(durations), 6),
+                "p50": _percentile(durations, 0.50),
+                "p95": _percentile(durations, 0.95),
+            }
+            if kind == "cache":
+                summary[kind][name]["hits"] = sum(1 for s in items if s.get("hit"))
+            if kind == "provider":
+                summary[kind][name]["bytes"] = sum(s.get("bytes") or 0 for s in items)
+                summary[kind][name]["tokens"] = sum(s.get("tokens") or 0 for s in items)
+    return summary
+
+
+def prometheus_text(summary, run, duration, totals):
+    """Render a summary in the Prometheus text exposition format"""
+    lines = []
+
+    def sample(name, labels, value):
+        label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_str}}} {value}")
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            sample(name, labels, value)
+
+    for kind in ("provider", "stage"):
+        rows = summary.get(kind, {})
+        name = f"dst_{kind}_duration_seconds"
+        lines.append(f"# HELP {name} Latency of {kind} calls in the last {run} run")
+        lines.append(f"# TYPE {name} summary")
+        for label, row in rows.items():
+            sample(name, {kind: label, "quantile": "0.5"}, row["p50"])
+            sample(name, {kind: label, "quantile": "0.95"}, row["p95"])
+            sample(f"{name}_sum", {kind: label}, row["total"])
+            sample(f"{name}_count", {kind: label}, row["count"])
+        metric(f"dst_{kind}_errors", "gauge", f"Failed {kind} calls in the last {run} run",
+               [({kind: label}, row["errors"]) for label, row in rows.items()])
+
+    providers = summary.get("provider", {})
+    metric("dst_provider_bytes", "gauge", f"Response bytes received in the last {run} run",
+           [({"provider": name}, row["bytes"]) for name, row in providers.items()])
+    metric("dst_llm_tokens", "gauge", f"LLM tokens used in the last {run} run",
+           [({"provider": name}, row["tokens"]) for name, row in providers.items() if row["tokens"]])
+
+    caches = summary.get("cache", {})
+    metric("dst_cache_lookups", "gauge", f"Cache lookups in the last {run} run", [
+        sample
+        for name, row in caches.items()
+        for sample in (({"namespace": name, "result": "hit"}, row["hits"]),
+                       ({"namespace": name, "result": "miss"}, row["count"] - row["hits"]))
+    ])
+
+    metric("dst_run_duration_seconds", "gauge", "Wall time of the last run", [({"run": run}, round(duration, 3))])
+    for key, value in totals.items():
+        metric(f"dst_run_{key}", "gauge", f"{key.replace('_', ' ').capitalize()} in the last run",
+               [({"run": run}, value)])
+    metric("dst_run_last_finished_timestamp_seconds", "gauge", "Unix time the last run finished",
+           [({"run": run}, round(time.time()))])
+    return "\n".join(lines) + "\n"
+
+
+def finish_trace(trace_dir=TRACE_DIR, metrics_path=METRICS_TEXTFILE, **totals):
+    """Write the active trace and its metrics, then stop tracing; returns the trace path
+
+    Extra keyword arguments (e.g. tickers=10, incomplete_tickers=1) are recorded
+    as run totals.
+    """
+    global _trace
+    with _lock:
+        trace, _trace = _trace, None
+    if trace is None:
+        return None
+
+    duration = time.perf_counter() - trace["t0"]
+    spans = sorted((s.as_dict(trace["t0"]) for s in trace["spans"]), key=lambda s: s["start"])
+    summary = summarize(spans)
+
+    Path(trace_dir).mkdir(parents=True, exist_ok=True)
+    path = Path(trace_dir) / f"{trace['run']}_{trace['started']:%Y-%m-%d_%H%M%S}.json"
+    with open(path, "w") as f:
+        json.dump({
+            "run": trace["run"],
+            "started": trace["started"].isoformat(timespec="seconds"),
+            "duration": round(duration, 3),
+            "totals": totals,
+            "summary": summary,
+            "spans": spans,
+        }, f, indent=1)
+
+    if metrics_path:
+        Path(metrics_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{metrics_path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(prometheus_text(summary, trace["run"], duration, totals))
+        os.replace(tmp, metrics_path)  # the collector must never read a half-written file
+
+    for name, row in summary["provider"].items():
+        print(f"[trace] {name}: {row['count']} call(s), p50 {row['p50'] * 1000:.0f}ms, "
+              f"p95 {row['p95'] * 1000:.0f}ms, {row['errors']} error(s)")
+    print(f"[trace] {duration:.1f}s total; trace written to {path}")
+    return path
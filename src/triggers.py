@@ -0,0 +1,193 @@
+"""
+Event-driven re-scoring from cheap change sources.
+
+Rather than re-running the whole batch more often, each poll looks for
+changes and re-scores only the tickers they touch:
+
+* news feeds, fetched with conditional GETs (ETag / Last-Modified), so an
+  unchanged feed costs a 304;
+* SEC insider filings, one query for the whole universe sorted by filedAt,
+  skipping accession numbers the report already scored or a poll has
+  already seen today;
+* prices, on a slower cadence (DST_TRIGGER_PRICE_MINUTES) and only while
+  the market is open, against a move of DST_TRIGGER_PRICE_MOVE points from
+  the price the ticker was last scored on, or any move that would put the
+  score in a different band.
+
+The self-hosted scheduler runs this as its only intraday job.
+
+Changed tickers go through analyze_tickers, whose input fingerprints keep
+unaffected stages from re-running. The results are written into today's log
+and, with --webhook, queued for delivery. The Discord bot notices the
+updated log and alerts the $watch channels of any changed ticker.
+
+    python src/triggers.py [--once] [--webhook]
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from dst_agent import analyze_tickers, build_signal, classify_score, get_price_change_pct, get_today, load_log
+from insider_scraper import get_recent_filings
+from news_scraper import fetch_feed
+
+STATE_PATH = os.getenv("DST_TRIGGERS_PATH", "data/triggers.json")
+POLL_MINUTES = int(os.getenv("DST_TRIGGER_MINUTES", "5"))
+PRICE_MINUTES = int(os.getenv("DST_TRIGGER_PRICE_MINUTES", "60"))
+PRICE_MOVE = float(os.getenv("DST_TRIGGER_PRICE_MOVE", "2.0"))
+SEC_BATCH = 100  # tickers per filings query
+HEADLINES = 3    # the headlines the news stage actually reads
+
+
+def load_state(path=STATE_PATH):
+    """Trigger state for today; anything from an earlier day is dropped"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    if state.get("date") != get_today():
+        state = {"date": get_today()}
+    state.setdefault("feeds", {})
+    state.setdefault("filings", [])
+    state.setdefault("prices_checked", 0)
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def check_feeds(entries, state):
+    """Tickers whose top headlines gained an item since they were last seen"""
+    changed = {}
+    for ticker, entry in entries.items():
+        feed = state["feeds"].get(ticker, {})
+        try:
+            headlines, etag, modified = fetch_feed(ticker, feed.get("etag"), feed.get("modified"))
+        except Exception as e:
+            print(f"Error checking news feed for {ticker}: {e}")
+            continue
+        if headlines is None:
+            continue  # 304 Not Modified
+        top = headlines[:HEADLINES]
+        known = feed.get("headlines", entry.get("headlines") or [])
+        state["feeds"][ticker] = {"etag": etag, "modified": modified, "headlines": top}
+        if set(top) - set(known):
+            changed[ticker] = "new headlines"
+    return changed
+
+
+def check_filings(entries, state):
+    """Tickers with an insider filing today that hasn't been seen yet"""
+    seen = set(state["filings"])
+    # Filings the report (or an earlier re-score) read are already in its score
+    for entry in entries.values():
+        insider = entry.get("insider_data") or {}
+        seen.update(insider.get("filings") or [])
+        if insider.get("latest_filing"):
+            seen.add(insider["latest_filing"])
+    tickers = sorted(entries)
+    changed = {}
+    for i in range(0, len(tickers), SEC_BATCH):
+        try:
+            filings = get_recent_filings(tickers[i:i + SEC_BATCH], state["date"])
+        except Exception as e:
+            print(f"Error checking insider filings: {e}")
+            continue
+        for filing in filings:
+            if not filing["accession_no"] or filing["accession_no"] in seen:
+                continue
+            seen.add(filing["accession_no"])
+            state["filings"].append(filing["accession_no"])
+            if filing["ticker"] in entries:
+                changed[filing["ticker"]] = "new insider filing"
+    return changed
+
+
+def check_prices(entries, state, move=PRICE_MOVE):
+    """Tickers whose daily change moved `move` points from the scored value, or enough to change band"""
+    state["prices_checked"] = time.time()
+    changed = {}
+    for ticker, entry in entries.items():
+        pct = get_price_change_pct(ticker)
+        scored = entry.get("price_change_pct")
+        if pct is None:
+            continue
+        if scored is None or abs(pct - scored) >= move:
+            changed[ticker] = f"price {scored if scored is not None else '?'}% → {pct:.2f}%"
+            continue
+        # Small moves still count if they push the score across a band
+        band = classify_score(build_signal(ticker, pct, news_analysis=entry.get("news_analysis"),
+                                           insider_data=entry.get("insider_data"))["score"])
+        if band != (entry.get("signal"), entry.get("confidence")):
+            changed[ticker] = f"signal moved to {' '.join(band)}"
+    return changed
+
+
+def poll_once(webhook=False, check_prices_now=None):
+    """Check every change source once and re-score what changed; returns the re-scored tickers
+
+    Prices are checked when check_prices_now is true, or by default when
+    PRICE_MINUTES have passed and the market is open: outside trading hours
+    the close can't move, and every check costs an Alpha Vantage call per
+    ticker.
+    """
+    # Imported here because the scheduler imports this module for its poll job
+    from scheduler import is_market_open, publish_update
+
+    path = Path(f"logs/dst_{get_today()}.json")
+    if not path.exists():
+        print("No report for today yet; nothing to re-score")
+        return []
+    report = load_log(path)
+    entries = {s["ticker"]: s for s in report.get("signals", [])}
+    state = load_state()
+
+    changed = {}
+    changed.update(check_filings(entries, state))
+    changed.update(check_feeds(entries, state))
+    if check_prices_now is None:
+        check_prices_now = is_market_open() and time.time() - state["prices_checked"] >= PRICE_MINUTES * 60
+    if check_prices_now:
+        changed.update(check_prices(entries, state))
+    save_state(state)
+
+    if not changed:
+        return []
+    for ticker, reason in sorted(changed.items()):
+        print(f"Trigger {ticker}: {reason}")
+    result = analyze_tickers(sorted(changed))
+    if result["signals"]:
+        publish_update(report, result["signals"], webhook=webhook)
+    return [s["ticker"] for s in result["signals"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score tickers when their inputs change")
+    parser.add_argument("--once", action="store_true", help="poll once (prices included) and exit")
+    parser.add_argument("--webhook", action="store_true", help="also queue changed tickers for the webhook")
+    args = parser.parse_args()
+
+    if args.once:
+        poll_once(webhook=args.webhook, check_prices_now=True)
+        return
+    print(f"Watching for changes every {POLL_MINUTES} min (prices every {PRICE_MINUTES} min while the market is open)")
+    while True:
+        try:
+            poll_once(webhook=args.webhook)
+        except Exception as e:
+            print(f"Error polling triggers: {e}")
+        time.sleep(POLL_MINUTES * 60)
+
+
+if __name__ == "__main__":
+    main()
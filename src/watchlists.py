@@ -0,0 +1,98 @@
+"""
+Per-user and per-channel watchlists managed from Discord.
+
+Stored in data/watchlists.json as
+    {"users": {"<user id>": ["AAPL", ...]}, "channels": {"<channel id>": [...]}}
+
+The daily run analyzes the union of every list (plus data/stocks.json) once,
+and each subscriber's digest is cut from those shared results with
+subset_report, so cost scales with unique tickers rather than subscribers.
+"""
+import json
+import os
+from pathlib import Path
+
+WATCHLISTS_PATH = "data/watchlists.json"
+KINDS = ("users", "channels")
+
+
+def load_watchlists(path=WATCHLISTS_PATH):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    for kind in KINDS:
+        data.setdefault(kind, {})
+    return data
+
+
+def save_watchlists(watchlists, path=WATCHLISTS_PATH):
+    # Write-then-rename so the daily job never reads a half-written file
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(watchlists, f, indent=2)
+    os.replace(tmp, path)
+
+
+def get_list(watchlists, kind, owner_id):
+    return watchlists[kind].get(str(owner_id), [])
+
+
+def add_tickers(watchlists, kind, owner_id, tickers):
+    """Append tickers to a list; returns the ones that were new"""
+    current = watchlists[kind].setdefault(str(owner_id), [])
+    added = [t for t in dict.fromkeys(t.upper() for t in tickers) if t not in current]
+    current.extend(added)
+    return added
+
+
+def remove_tickers(watchlists, kind, owner_id, tickers):
+    """Remove tickers from a list; returns the ones that were present"""
+    current = watchlists[kind].get(str(owner_id), [])
+    removed = [t for t in dict.fromkeys(t.upper() for t in tickers) if t in current]
+    watchlists[kind][str(owner_id)] = [t for t in current if t not in removed]
+    if not watchlists[kind][str(owner_id)]:
+        del watchlists[kind][str(owner_id)]
+    return removed
+
+
+def subscriber_lists(watchlists):
+    """Yield (kind, owner_id, tickers) for every non-empty list"""
+    for kind in KINDS:
+        for owner_id, tickers in watchlists[kind].items():
+            if tickers:
+                yield kind, owner_id, tickers
+
+
+def all_tickers(base, watchlists):
+    """Union of the base universe and every watchlist, each ticker once, base order first"""
+    union = dict.fromkeys(t.upper() for t in base)
+    for _, _, tickers in subscriber_lists(watchlists):
+        union.update(dict.fromkeys(tickers))
+    return list(union)
+
+
+def top_movers(result, tickers, per_side=2):
+    """Strongest buys and sells among `tickers`, in the order the analysis ranked them"""
+    keep = set(tickers)
+    return ([t for t in result["buy"] if t in keep][:per_side] +
+            [t for t in result["sell"] if t in keep][:per_side])
+
+
+def subset_report(report, tickers):
+    """Restrict a shared report to one subscriber's tickers"""
+    keep = set(t.upper() for t in tickers)
+    return {
+        **report,
+        "buy": [t for t in report.get("buy", []) if t in keep],
+        "sell": [t for t in report.get("sell", []) if t in keep],
+        "hold": [t for t in report.get("hold", []) if t in keep],
+        "signals": [s for s in report.get("signals", []) if s.get("ticker") in keep],
+        "news": {t: v for t, v in report.get("news", {}).items() if t in keep},
+        "insider_activity": [
+            line for line in report.get("insider_activity", [])
+            if any(f" - {t} " in line for t in keep)
+        ],
+    }
@@ -0,0 +1,150 @@
+"""
+Prioritized, fair async work queue with rate limiting for the Discord bot.
+
+Jobs are ordered by (priority, per-user round, arrival), so an explicit
+$analyze beats a cache miss, which beats a background refresh, and within a
+priority one chatty user can't push everyone else back: each user's Nth
+queued job waits behind everybody else's (N-1)th. Submissions are checked
+against per-user, per-guild and global token buckets before they are queued;
+background refreshes draw on a budget of their own, so they can never use up
+what users' requests need. The queue itself is bounded so the bot applies backpressure instead of
+accumulating work (and API quota) without limit.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+
+from ratelimit import TokenBucket
+
+PRIORITY_ANALYZE = 0   # explicit $analyze
+PRIORITY_MISS = 1      # $TICKER mention that missed the cache
+PRIORITY_REFRESH = 2   # background refresh (watches etc.)
+
+PRUNE_INTERVAL = 300  # seconds between sweeps of idle per-user/per-guild buckets
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_pending jobs"""
+
+
+class RateLimitedError(Exception):
+    """Raised when a user, guild or the bot as a whole is over its rate limit"""
+
+    def __init__(self, scope, retry_after):
+        super().__init__(f"{scope} rate limit exceeded; retry in {retry_after:.0f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class WorkQueue:
+    def __init__(self, run, workers=4, max_pending=20,
+                 user_rate=None, guild_rate=None, global_rate=None, refresh_rate=None):
+        """
+        run: coroutine function called as `await run(key)` for each job.
+        *_rate: (tokens per second, burst) tuples, or None for no limit.
+        PRIORITY_REFRESH jobs are charged to refresh_rate instead of global_rate.
+        """
+        self.run = run
+        self.workers = workers
+        self.max_pending = max_pending
+        self.user_rate = user_rate
+        self.guild_rate = guild_rate
+        self.global_bucket = TokenBucket(*global_rate) if global_rate else None
+        self.refresh_bucket = TokenBucket(*refresh_rate) if refresh_rate else None
+        self.user_buckets = {}
+        self.guild_buckets = {}
+        self._pruned = time.monotonic()
+        self.active = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._rounds = defaultdict(int)  # user -> jobs currently queued
+        self._ready = None
+        self._worker_tasks = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _ensure_workers(self):
+        if self._ready is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._ready = asyncio.Queue()  # one token per queued job
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _prune_buckets(self):
+        """Forget buckets that have refilled; a new one starts out exactly the same"""
+        now = time.monotonic()
+        if now - self._pruned < PRUNE_INTERVAL:
+            return
+        self._pruned = now
+        for buckets in (self.user_buckets, self.guild_buckets):
+            for key in [k for k, bucket in buckets.items() if bucket.is_full()]:
+                del buckets[key]
+
+    def _buckets_for(self, user_id, guild_id, priority):
+        if priority == PRIORITY_REFRESH:
+            return [("Background", self.refresh_bucket)] if self.refresh_bucket else []
+        buckets = []
+        if self.user_rate and user_id is not None:
+            if user_id not in self.user_buckets:
+                self.user_buckets[user_id] = TokenBucket(*self.user_rate)
+            buckets.append(("User", self.user_buckets[user_id]))
+        if self.guild_rate and guild_id is not None:
+            if guild_id not in self.guild_buckets:
+                self.guild_buckets[guild_id] = TokenBucket(*self.guild_rate)
+            buckets.append(("Server", self.guild_buckets[guild_id]))
+        if self.global_bucket:
+            buckets.append(("Bot", self.global_bucket))
+        return buckets
+
+    def submit(self, key, priority=PRIORITY_MISS, user_id=None, guild_id=None, run=None):
+        """Queue a job; returns (future, position) where position 0 means it starts now
+
+        run, if given, replaces the queue's run function for this job. Raises
+        RateLimitedError or QueueFullError without consuming anything.
+        """
+        self._ensure_workers()
+        if len(self._heap) >= self.max_pending:
+            raise QueueFullError(f"Analysis queue is full ({self.max_pending} pending)")
+
+        # Check every bucket before taking from any of them
+        self._prune_buckets()
+        buckets = self._buckets_for(user_id, guild_id, priority)
+        for scope, bucket in buckets:
+            wait = bucket.wait_time()
+            if wait > 0:
+                raise RateLimitedError(scope, wait)
+        for _, bucket in buckets:
+            bucket.try_acquire()
+
+        rank = (priority, self._rounds[user_id], next(self._seq))
+        ahead = sum(1 for entry in self._heap if entry[0] < rank)
+        position = 0 if self.active + len(self._heap) < self.workers else ahead + 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._rounds[user_id] += 1
+        heapq.heappush(self._heap, (rank, key, user_id, future, run or self.run))
+        self._ready.put_nowait(None)
+        return future, position
+
+    async def _worker(self):
+        while True:
+            await self._ready.get()
+            _, key, user_id, future, run = heapq.heappop(self._heap)
+            self._rounds[user_id] -= 1
+            if not self._rounds[user_id]:
+                del self._rounds[user_id]
+            if future.done():
+                continue
+            self.active += 1
+            try:
+                result = await run(key)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.active -= 1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark against the local provider stub.
+
+Starts testing/stub_server.py in-process, then for each mode and universe
+size runs the pipeline in a fresh subprocess and working directory (cold
+cache, no fingerprints) with every provider URL pointed at the stub:
+
+* analyze: analyze_tickers over the universe;
+* main:    src/main.py with no deadline, then the outbox drained to the stub
+           webhook.
+
+Reports wall time, requests per provider (with injected errors and
+throttled calls) and the subprocess's peak RSS per configuration:
+
+    python testing/benchmark.py
+    python testing/benchmark.py --sizes 10 100 --modes main --latency-ms 80 --error-rate 0.02
+    python testing/benchmark.py --rate-limit alphavantage=75 --json bench.json
+
+Needs config/config.py (see config/config.py.example); the keys themselves
+come from the stub's environment.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from stub_server import PROVIDERS, add_stub_arguments, parse_rate_limits, provider_env, start
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def universe(size):
+    """`size` distinct synthetic tickers (AAAA, AAAB, ...)"""
+    return ["".join(t) for t in itertools.islice(itertools.product(string.ascii_uppercase, repeat=4), size)]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB elsewhere
+
+
+def child(mode, result_path):
+    """Run one configuration inside the benchmark's working directory"""
+    sys.path.insert(0, str(SRC))
+    started = time.perf_counter()
+    extra = {}
+    if mode == "main":
+        import main
+        from outbox import drain
+        main.main(["--deadline-minutes", "0", "--backfill-minutes", "0"])
+        extra["messages_sent"] = drain(os.environ["DISCORD_WEBHOOK_URL"])
+    else:
+        from dst_agent import analyze_tickers, load_tickers
+        result = analyze_tickers(load_tickers())
+        extra["signals"] = len(result["signals"])
+    Path(result_path).write_text(json.dumps({
+        "wall": time.perf_counter() - started,
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }))
+
+
+def run_config(server, mode, size, keep=False, timeout=None):
+    workdir = Path(tempfile.mkdtemp(prefix=f"dst-bench-{mode}-{size}-"))
+    (workdir / "data").mkdir()
+    (workdir / "data" / "stocks.json").write_text(json.dumps(universe(size)))
+    result_path = workdir / "result.json"
+    env = {**os.environ, **provider_env(server.base_url), "PYTHONUNBUFFERED": "1"}
+
+    server.reset()
+    started = time.perf_counter()
+    with open(workdir / "bench.log", "w") as log:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--result", str(result_path)],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, timeout=timeout,
+        )
+    elapsed = time.perf_counter() - started
+
+    row = {"mode": mode, "tickers": size, "exit_code": proc.returncode, "requests": server.stats()}
+    if result_path.exists():
+        row.update(json.loads(result_path.read_text()))
+    else:
+        row["wall"] = elapsed  # the child died; this includes interpreter start-up
+    if keep or proc.returncode:
+        row["workdir"] = str(workdir)
+        print(f"  output kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return row
+
+
+def format_row(row):
+    requests = row["requests"]
+    counts = " ".join(f"{requests.get(p, {}).get('requests', 0):>6}" for p in PROVIDERS)
+    errors = sum(c.get("errors", 0) for c in requests.values())
+    throttled = sum(c.get("throttled", 0) for c in requests.values())
+    peak = f"{row['peak_rss_mb']:8.1f}" if row.get("peak_rss_mb") is not None else f"{'-':>8}"
+    status = "" if row["exit_code"] == 0 else f"  exit {row['exit_code']}"
+    return (f"{row['mode']:<8} {row['tickers']:>6} {row['wall']:9.1f} {counts} "
+            f"{errors:>6} {throttled:>7} {peak}{status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline against a local provider stub")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="universe sizes to run")
+    parser.add_argument("--modes", nargs="+", choices=["analyze", "main"], default=["analyze", "main"])
+    add_stub_arguments(parser)
+    parser.add_argument("--timeout", type=float, help="give up on a configuration after this many seconds")
+    parser.add_argument("--keep", action="store_true", help="keep each run's working directory (logs, trace, caches)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", choices=["analyze", "main"], help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.result)
+        return
+
+    server = start(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                   rate_limits=parse_rate_limits(args.rate_limit), seed=args.seed)
+    print(f"Stub at {server.base_url}: latency {args.latency_ms:g}±{args.jitter_ms:g}ms, "
+          f"error rate {args.error_rate:g}, rate limits {parse_rate_limits(args.rate_limit) or 'none'}")
+
+    rows = []
+    for mode, size in itertools.product(args.modes, args.sizes):
+        print(f"Running {mode} over {size} ticker(s)...")
+        rows.append(run_config(server, mode, size, args.keep, args.timeout))
+
+    print()
+    print(f"{'mode':<8} {'tickers':>6} {'wall (s)':>9} " + " ".join(f"{p[:6]:>6}" for p in PROVIDERS)
+          + f" {'errors':>6} {'limited':>7} {'peak MB':>8}")
+    for row in rows:
+        print(format_row(row))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"stub": {k: v for k, v in vars(args).items() if k not in ("child", "result", "json")},
+                       "results": rows}, f, indent=2)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
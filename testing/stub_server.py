@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for every provider the pipeline calls, for offline benchmarks.
+
+Serves deterministic (per ticker and day) responses for:
+
+    GET  /alphavantage/query          OVERVIEW and TIME_SERIES_DAILY_ADJUSTED
+    GET  /news/rss/search?q=T+stock   Google News RSS, with ETag / 304 support
+    POST /sec/insider-trading         sec-api.io insider-trading search
+    POST /openai/v1/chat/completions  OpenAI chat completions (JSON content, usage)
+    POST /discord/webhooks/...        Discord webhook (?wait=true returns a message)
+    GET  /_stats, POST /_reset        request counters per provider
+
+with configurable latency, error rate and per-provider rate limits. Point
+the agent at it with the variables printed on start-up:
+
+    python testing/stub_server.py --latency-ms 50 --error-rate 0.01 --rate-limit alphavantage=75
+
+Over its limit a provider answers the way the real one does: Alpha Vantage
+with an HTTP 200 "Note", the others with 429 and Retry-After.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PROVIDERS = ("alphavantage", "news", "sec", "openai", "discord")
+
+
+def provider_env(base):
+    """Environment that points the agent's clients at a stub served from `base`"""
+    return {
+        "DST_ALPHA_VANTAGE_URL": f"{base}/alphavantage/query",
+        "DST_NEWS_FEED_URL": f"{base}/news/rss/search",
+        "DST_SEC_API_URL": f"{base}/sec",
+        "OPENAI_BASE_URL": f"{base}/openai/v1",
+        "DISCORD_WEBHOOK_URL": f"{base}/discord/webhooks/0/stub",
+        "ALPHA_VANTAGE_KEY": "stub",
+        "OPENAI_API_KEY": "stub",
+        "SEC_API_KEY": "stub",
+    }
+
+
+def seeded(*parts):
+    """A Random that gives the same answers for the same ticker on the same day"""
+    return random.Random(":".join(str(p) for p in (date.today(), *parts)))
+
+
+def trading_days(count):
+    days, day = [], date.today()
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day -= timedelta(days=1)
+    return days
+
+
+def overview(symbol):
+    rng = seeded("overview", symbol)
+    return {
+        "Symbol": symbol,
+        "PERatio": f"{rng.uniform(5, 60):.2f}",
+        "EPS": f"{rng.uniform(-2, 15):.2f}",
+        "MarketCapitalization": str(rng.randint(10**8, 3 * 10**12)),
+        "Sector": rng.choice(["TECHNOLOGY", "HEALTH CARE", "ENERGY", "FINANCE", "INDUSTRIALS"]),
+        "ReturnOnEquityTTM": f"{rng.uniform(-0.2, 0.6):.3f}",
+    }
+
+
+def daily_series(symbol):
+    rng = seeded("prices", symbol)
+    close, series = rng.uniform(10, 500), {}
+    for day in reversed(trading_days(100)):
+        close *= 1 + rng.gauss(0, 0.02)
+        series[day] = {"1. open": f"{close:.2f}", "4. close": f"{close:.4f}", "6. volume": str(rng.randint(10**5, 10**7))}
+    return {"Meta Data": {"2. Symbol": symbol}, "Time Series (Daily)": dict(reversed(series.items()))}
+
+
+def rss(symbol, items=10):
+    rng = seeded("news", symbol)
+    entries = "".join(
+        f"<item><title>{symbol} {rng.choice(['beats', 'misses', 'holds', 'raises', 'cuts'])} "
+        f"{rng.choice(['guidance', 'estimates', 'dividend', 'outlook'])} ({i + 1})</title>"
+        f"<link>https://example.com/{symbol}/{i}</link><pubDate>{datetime.now():%a, %d %b %Y} 12:00:00 GMT</pubDate></item>"
+        for i in range(items)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{symbol}</title>{entries}</channel></rss>'.encode()
+
+
+def insider_transactions(symbol):
+    rng = seeded("sec", symbol)
+    filings = []
+    for i in range(rng.randint(0, 3)):
+        code = rng.choice("PSAF")
+        filings.append({
+            "accessionNo": f"0000{int(hashlib.md5(symbol.encode()).hexdigest()[:8], 16)}-{date.today():%y%m%d}-{i}",
+            "filedAt": f"{date.today()}T16:0{i}:00-04:00",
+            "issuer": {"tradingSymbol": symbol},
+            "reportingOwner": {"name": f"Insider {i + 1}", "relationship": {"isOfficer": True, "officerTitle": "CFO"}},
+            "nonDerivativeTable": {"transactions": [{
+                "transactionDate": date.today().isoformat(),
+                "coding": {"code": code},
+                "amounts": {"shares": rng.randint(100, 50000), "pricePerShare": round(rng.uniform(10, 500), 2),
+                            "acquiredDisposedCode": "A" if code in "PA" else "D"},
+            }]},
+        })
+    return filings
+
+
+def chat_completion(prompt):
+    rng = random.Random(hashlib.md5(prompt.encode()).hexdigest())
+    content = json.dumps({
+        "summary": "Stub summary of the supplied items.",
+        "sentiment_score": round(rng.uniform(-1, 1), 2),
+        "reasoning": "Stub reasoning.",
+    })
+    prompt_tokens = len(prompt) // 4
+    return {
+        "id": f"chatcmpl-stub{rng.randint(0, 10**9)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-3.5-turbo",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 40, "total_tokens": prompt_tokens + 40},
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limits=None, seed=0):
+        super().__init__(address, StubHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits or {}  # {provider: requests per minute}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self):
+        with self.lock:
+            self.counts = defaultdict(lambda: defaultdict(int))
+            self.windows = defaultdict(deque)
+            self.messages = 0
+
+    def stats(self):
+        with self.lock:
+            return {provider: dict(counts) for provider, counts in self.counts.items()}
+
+    def admit(self, provider):
+        """Count a request; returns "ok", "error" or "throttled" """
+        with self.lock:
+            self.counts[provider]["requests"] += 1
+            limit = self.rate_limits.get(provider)
+            if limit:
+                window, now = self.windows[provider], time.monotonic()
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= limit:
+                    self.counts[provider]["throttled"] += 1
+                    return "throttled"
+                window.append(now)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.counts[provider]["errors"] += 1
+                return "error"
+            delay = max(self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+        time.sleep(delay)
+        return "ok"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def gate(self, provider):
+        """Apply latency, errors and rate limits; returns False once an error response is sent"""
+        outcome = self.server.admit(provider)
+        if outcome == "ok":
+            return True
+        if outcome == "throttled" and provider == "alphavantage":
+            self.send_body(200, {"Note": "Thank you for using Alpha Vantage! Our standard API rate limit is "
+                                         f"{self.server.rate_limits[provider]:g} requests per minute."})
+        elif outcome == "throttled":
+            self.send_body(429, {"message": "rate limited", "retry_after": 1.0}, headers={"Retry-After": "1"})
+        else:
+            self.send_body(503, {"error": "stub failure"})
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/_stats":
+            self.send_body(200, self.server.stats())
+        elif url.path == "/alphavantage/query":
+            if not self.gate("alphavantage"):
+                return
+            symbol = query.get("symbol", "").upper()
+            function = query.get("function")
+            if function == "OVERVIEW":
+                self.send_body(200, overview(symbol))
+            elif function and function.startswith("TIME_SERIES_DAILY"):
+                self.send_body(200, daily_series(symbol))
+            else:
+                self.send_body(200, {"Error Message": f"Invalid API call: {function}"})
+        elif url.path == "/news/rss/search":
+            if not self.gate("news"):
+                return
+            symbol = query.get("q", "").split()[0].upper()
+            body = rss(symbol)
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                with self.server.lock:
+                    self.server.counts["news"]["not_modified"] += 1
+                self.send_body(304, headers={"ETag": etag})
+            else:
+                self.send_body(200, body, "application/rss+xml", {"ETag": etag})
+        else:
+            self.send_body(404, {"error": f"no stub for GET {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/_reset":
+            self.server.reset()
+            self.send_body(204)
+        elif url.path == "/sec/insider-trading":
+            payload = self.read_json()
+            if not self.gate("sec"):
+                return
+            match = re.search(r"tradingSymbol:\(?([^)]*?)\)?(?: AND |$)", payload.get("query", ""))
+            symbols = [s.strip().upper() for s in match.group(1).split(" OR ")] if match else []
+            filings = [f for s in symbols for f in insider_transactions(s)]
+            filings.sort(key=lambda f: f["filedAt"], reverse=True)
+            size = int(payload.get("size", 50))
+            self.send_body(200, {"total": {"value": len(filings)}, "transactions": filings[:size]})
+        elif url.path == "/openai/v1/chat/completions":
+            payload = self.read_json()
+            if not self.gate("openai"):
+                return
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+            self.send_body(200, chat_completion(prompt))
+        elif url.path.startswith("/discord/webhooks/"):
+            self.read_json()
+            if not self.gate("discord"):
+                return
+            with self.server.lock:
+                self.server.messages += 1
+                message_id = self.server.messages
+            if parse_qs(url.query).get("wait") == ["true"]:
+                self.send_body(200, {"id": str(message_id)})
+            else:
+                self.send_body(204)
+        else:
+            self.send_body(404, {"error": f"no stub for POST {url.path}"})
+
+
+def parse_rate_limits(values):
+    """["alphavantage=75", ...] -> {"alphavantage": 75.0}"""
+    limits = {}
+    for value in values or []:
+        provider, _, rate = value.partition("=")
+        if provider not in PROVIDERS or not rate:
+            raise argparse.ArgumentTypeError(f"expected PROVIDER=PER_MINUTE with PROVIDER in {', '.join(PROVIDERS)}")
+        limits[provider] = float(rate)
+    return limits
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=20, help="added to every provider response")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="uniform +/- jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--rate-limit", action="append", metavar="PROVIDER=PER_MINUTE",
+                        help=f"per-provider request limit ({', '.join(PROVIDERS)}); repeatable")
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency jitter and injected errors")
+
+
+def start(port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limits=None, seed=0):
+    """Serve the stub on a background thread; returns the server"""
+    server = StubServer(("127.0.0.1", port), latency_ms, jitter_ms, error_rate, rate_limits, seed)
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local provider stub for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8799)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), args.latency_ms, args.jitter_ms, args.error_rate,
+                        parse_rate_limits(args.rate_limit), args.seed)
+    print(f"Provider stub listening on {server.base_url}; point the agent at it with:")
+    for name, value in provider_env(server.base_url).items():
+        print(f"  export {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()